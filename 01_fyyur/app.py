@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 
 import datetime
+import functools
 import logging
 
-from flask import Flask, render_template
+import click
+from flask import Flask, jsonify, render_template
 from flask_migrate import Migrate
 from flask_moment import Moment
 from logging import Formatter, FileHandler
@@ -12,7 +14,15 @@ from logging import Formatter, FileHandler
 from controllers.artists import artist_blueprint
 from controllers.shows import show_blueprint
 from controllers.venues import venue_blueprint
+from db_pool import pool_stats
+from jobs import JobQueue
+from models.artist import Artist
 from models.model import db
+from models.venue import Venue
+from page_cache import PageCache, invalidate
+from profiler import QueryProfiler
+from rendering import Rendering
+from show_import import import_shows
 
 
 app = Flask(__name__)
@@ -20,6 +30,10 @@ moment = Moment(app)
 app.config.from_object('config')
 db.init_app(app)
 migrate = Migrate(app, db)
+profiler = QueryProfiler(app)
+page_cache = PageCache(app)
+rendering = Rendering(app)
+job_queue = JobQueue(app)
 
 if not app.debug:
     file_handler = FileHandler('error.log')
@@ -42,6 +56,8 @@ app.register_blueprint(venue_blueprint, url_prefix='/venues')
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
+# Listings repeat the same show times, so keep the formatted strings.
+@functools.lru_cache(maxsize=4096)
 def format_datetime(value, format='medium'):
     if not value:
         return "TBA"
@@ -51,6 +67,52 @@ def format_datetime(value, format='medium'):
 app.jinja_env.filters['datetime'] = format_datetime
 
 
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+@app.cli.command('refresh-show-counters')
+@click.option('--all', 'refresh_all', is_flag=True,
+              help='Recount every artist and venue, not just stale ones.')
+def refresh_show_counters(refresh_all):
+    """Rolls shows that have started from upcoming to past.
+
+    Meant to run periodically, e.g. from cron every few minutes.
+    """
+    for model in (Artist, Venue):
+        model.refresh_show_counters(stale_only=not refresh_all)
+    db.session.commit()
+    invalidate('artist', 'venue')
+
+
+@app.cli.command('geocode-venues')
+def geocode_venues():
+    """Fills in the coordinates of venues without any from the offline
+    geocoding table."""
+    located = Venue.geocode_missing()
+    click.echo(f'located {located:,} venues')
+
+
+@app.cli.command('import-shows')
+@click.argument('file', type=click.File('r', encoding='utf-8'))
+@click.option('--batch-size', type=int, default=None,
+              help='Rows per transaction; defaults to SHOW_IMPORT_BATCH_SIZE.')
+def import_shows_command(file, batch_size):
+    """Imports shows from a CSV file with artist_id, venue_id and
+    start_time columns."""
+    try:
+        result = import_shows(
+            file,
+            batch_size=batch_size or app.config['SHOW_IMPORT_BATCH_SIZE']
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for line, reason in result.rejected:
+        click.echo(f'line {line}: {reason}', err=True)
+    click.echo(f'imported {result.imported:,} shows, rejected '
+               f'{len(result.rejected):,} rows in {result.seconds:.1f}s '
+               f'({result.rows_per_second:,.0f} rows/s)')
+
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
@@ -58,6 +120,18 @@ app.jinja_env.filters['datetime'] = format_datetime
 def index():
     return render_template('pages/home.html')
 
+@app.route('/stats/cache')
+def cache_stats():
+    return jsonify(page_cache.stats())
+
+@app.route('/stats/jobs')
+def job_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/stats/pool')
+def connection_pool_stats():
+    return jsonify(pool_stats(db.engine))
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -0,0 +1,4 @@
+"""Benchmarks for the Fyyur app.
+
+Run them from the 01_fyyur directory, e.g. `python -m benchmarks.search`.
+"""
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Compares deleting venues holding tens of thousands of shows by loading
+and deleting every show in the session, as the models used to, against
+leaving the shows to ON DELETE CASCADE, one venue at a time with
+Model.delete and all at once with Model.delete_all."""
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app import app
+from benchmarks.routes import QueryCounter
+from models.model import db
+from models.show import SHOW_LENGTH, Show
+from models.venue import Venue
+from populate import bulk_insert, populate_synthetic
+
+
+EPOCH = datetime(2030, 1, 1, 20, 0)
+
+
+def load_and_delete(venue_ids):
+    for venue_id in venue_ids:
+        venue = db.session.get(Venue, venue_id)
+        for show in list(venue.shows):
+            db.session.delete(show)
+        db.session.delete(venue)
+        db.session.flush()
+    db.session.commit()
+
+
+def passive_delete(venue_ids):
+    for venue_id in venue_ids:
+        db.session.get(Venue, venue_id).delete()
+
+
+def delete_all(venue_ids):
+    Venue.delete_all(venue_ids)
+
+
+STRATEGIES = {
+    'load and delete': load_and_delete,
+    'passive delete': passive_delete,
+    'delete_all': delete_all,
+}
+
+
+def book(venue_ids, shows, artists):
+    """Books shows at each venue, one after the other, so no venue or
+    artist is booked twice at once."""
+    rows = (
+        {
+            'venue_id': venue_id,
+            'artist_id': 1 + i % artists,
+            'start_time': EPOCH + timedelta(hours=4 * (n * shows + i)),
+            'end_time': EPOCH + timedelta(hours=4 * (n * shows + i))
+                        + SHOW_LENGTH,
+        }
+        for n, venue_id in enumerate(venue_ids)
+        for i in range(shows)
+    )
+    bulk_insert(Show.__table__, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--shows', type=int, default=20000,
+                        help='shows per deleted venue')
+    parser.add_argument('--venues', type=int, default=3,
+                        help='venues deleted by each strategy')
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a temporary SQLite database')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app.config['SQLALCHEMY_DATABASE_URI'] = (
+            args.database_url or f'sqlite:///{directory}/bench.db'
+        )
+        app.config['QUERY_PROFILING'] = False
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            populate_synthetic(venues=args.venues * len(STRATEGIES),
+                               artists=args.artists)
+            venue_ids = [id for (id,) in db.session.query(Venue.id)
+                                                   .order_by(Venue.id)]
+            book(venue_ids, args.shows, args.artists)
+            Venue.refresh_show_counters()
+            db.session.commit()
+
+            print(f'{args.venues} venues of {args.shows:,} shows each')
+            for n, (name, strategy) in enumerate(STRATEGIES.items()):
+                ids = venue_ids[n * args.venues:(n + 1) * args.venues]
+                with QueryCounter(db.engine) as queries:
+                    start = time.perf_counter()
+                    strategy(ids)
+                    elapsed = (time.perf_counter() - start) * 1000
+                db.session.remove()
+                left = db.session.query(Show) \
+                                 .filter(Show.venue_id.in_(ids)).count()
+                assert left == 0, f'{name} left {left} shows'
+                print(f'{name:>16}: {elapsed / args.venues:9.1f} ms per venue'
+                      f'  {queries.count / args.venues:9.1f} queries per '
+                      f'venue')
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Compares finding the k venues nearest a point through the geohash
+index against ranking every venue by distance."""
+import argparse
+import heapq
+import random
+import tempfile
+import time
+
+from app import app
+from models.geo import distance_km, geocode
+from models.model import db
+from models.venue import Venue
+from populate import CITIES, populate_synthetic
+
+
+def full_scan(latitude, longitude, k):
+    venues = db.session.query(Venue.id, Venue.latitude, Venue.longitude)
+    return [
+        id
+        for _, id
+        in heapq.nsmallest(k, (
+            (distance_km(latitude, longitude, venue.latitude,
+                         venue.longitude), venue.id)
+            for venue
+            in venues
+        ))
+    ]
+
+
+def geohash_index(latitude, longitude, k):
+    return [venue.id for venue, _ in Venue.nearest(latitude, longitude, k=k)]
+
+
+def points(rng, count):
+    """Points around the cities venues are generated in, plus a few far
+    from any of them."""
+    for _ in range(count):
+        if rng.random() < 0.9:
+            latitude, longitude = geocode(*rng.choice(CITIES))
+            yield (latitude + rng.uniform(-1, 1),
+                   longitude + rng.uniform(-1, 1))
+        else:
+            yield rng.uniform(25, 49), rng.uniform(-124, -67)
+
+
+def time_lookups(lookup, queries, k):
+    start = time.perf_counter()
+    results = [lookup(latitude, longitude, k) for latitude, longitude in queries]
+    return (time.perf_counter() - start) * 1000 / len(queries), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--venues', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--scan-queries', type=int, default=10,
+                        help='queries timed for the full scan, which is slow')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a temporary SQLite database')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app.config['SQLALCHEMY_DATABASE_URI'] = (
+            args.database_url or f'sqlite:///{directory}/bench.db'
+        )
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            populate_synthetic(venues=args.venues)
+            queries = list(points(random.Random(0), args.queries))
+
+            grid_ms, found = time_lookups(geohash_index, queries, args.k)
+            scan_ms, expected = time_lookups(
+                full_scan, queries[:args.scan_queries], args.k
+            )
+            assert found[:args.scan_queries] == expected
+            print(f'{args.venues:,} venues, k={args.k}')
+            print(f'{"geohash index":>12}: {grid_ms:8.2f} ms per query')
+            print(f'{"full scan":>12}: {scan_ms:8.2f} ms per query')
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
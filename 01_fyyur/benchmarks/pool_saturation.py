@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Drives a Fyyur route from more threads than the connection pool holds.
+
+Each thread stands in for a worker thread of the server. A delay added to
+every statement stands in for a slower database, keeping connections
+checked out long enough for requests to queue on the pool. For each level
+of concurrency the throughput, latency, failures and pool statistics are
+printed: once the threads outnumber pool_size + max_overflow, checkouts
+start to wait, and past pool_timeout they fail.
+"""
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+from app import app
+from db_pool import InstrumentedQueuePool, pool_stats
+from models.model import db
+from populate import populate_synthetic
+
+
+def worker(url, requests, latencies, failures):
+    client = app.test_client()
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            response = client.get(url)
+            ok = response.status_code == 200
+        except Exception:
+            ok = False
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not ok:
+            failures.append(url)
+
+
+def run(url, threads, requests):
+    latencies = []
+    failures = []
+    workers = [
+        threading.Thread(target=worker,
+                         args=(url, requests, latencies, failures))
+        for _ in range(threads)
+    ]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'throughput': len(latencies) / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'failures': len(failures),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default='/venues/1')
+    parser.add_argument('--threads', default='2,5,10,20,40')
+    parser.add_argument('--requests', type=int, default=20,
+                        help='requests per thread')
+    parser.add_argument('--pool-size', type=int, default=5)
+    parser.add_argument('--max-overflow', type=int, default=5)
+    parser.add_argument('--pool-timeout', type=float, default=2)
+    parser.add_argument('--query-delay-ms', type=float, default=20)
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a temporary SQLite database')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app.config['PAGE_CACHE'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = (
+            args.database_url or f'sqlite:///{directory}/bench.db'
+        )
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': args.pool_size,
+            'max_overflow': args.max_overflow,
+            'pool_timeout': args.pool_timeout,
+        }
+        if not args.database_url:
+            app.config['SQLALCHEMY_ENGINE_OPTIONS']['connect_args'] = {
+                'check_same_thread': False,
+            }
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            populate_synthetic(venues=100, artists=200, shows=2000)
+            engine = db.engine
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def slow_database(*args_):
+            time.sleep(args.query_delay_ms / 1000)
+
+        print(f'pool_size={args.pool_size} max_overflow={args.max_overflow} '
+              f'pool_timeout={args.pool_timeout}s '
+              f'query delay={args.query_delay_ms}ms')
+        for threads in map(int, args.threads.split(',')):
+            engine.dispose()
+            result = run(args.url, threads, args.requests)
+            stats = pool_stats(engine)
+            print(f'{threads:>3} threads: {result["throughput"]:7.1f} req/s  '
+                  f'p50 {result["p50"]:7.1f} ms  p95 {result["p95"]:7.1f} ms  '
+                  f'failed {result["failures"]:>4}  '
+                  f'peak out {stats["peak_checked_out"]:>3}  '
+                  f'wait mean {stats["wait_ms_mean"]:7.1f} ms  '
+                  f'max {stats["wait_ms_max"]:7.1f} ms  '
+                  f'timeouts {stats["timeouts"]}')
+
+        event.remove(engine, 'before_cursor_execute', slow_database)
+        with app.app_context():
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Measures what production rendering saves: loading every template in a
+new worker with and without the bytecode cache, and rendering pages with
+the plain and the memoized datetime filter."""
+import argparse
+import tempfile
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+import app as fyyur
+from app import app
+from models.model import db
+from populate import populate_synthetic
+
+
+def cold_load(bytecode_cache, repeat):
+    """Returns the mean milliseconds to load every template in a new
+    environment, as a freshly started worker would."""
+    elapsed = 0.0
+    for _ in range(repeat):
+        env = app.create_jinja_environment()
+        env.filters.update(app.jinja_env.filters)
+        env.bytecode_cache = bytecode_cache
+        start = time.perf_counter()
+        for name in env.list_templates(extensions=('html',)):
+            env.get_template(name)
+        elapsed += time.perf_counter() - start
+    return elapsed * 1000 / repeat
+
+
+def render(client, urls, repeat):
+    """Returns the mean milliseconds to render each of urls."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == 200, url
+    return (time.perf_counter() - start) * 1000 / (repeat * len(urls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--venues', type=int, default=200)
+    parser.add_argument('--artists', type=int, default=400)
+    parser.add_argument('--shows', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = FileSystemBytecodeCache(directory)
+        cold_load(cache, 1)
+        print(f'{"cold load":>18}: compiled {cold_load(None, args.repeat):7.1f}'
+              f' ms  bytecode cached {cold_load(cache, args.repeat):7.1f} ms')
+
+        app.config.update(
+            PAGE_CACHE=False,
+            SHOWS_PER_PAGE=200,
+            SQLALCHEMY_DATABASE_URI=f'sqlite:///{directory}/bench.db'
+        )
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            populate_synthetic(venues=args.venues, artists=args.artists,
+                               shows=args.shows)
+            client = app.test_client()
+            urls = ['/shows', '/venues/1', '/venues/2', '/artists/1']
+            memoized = fyyur.format_datetime
+            filters = app.jinja_env.filters
+            filters['datetime'] = memoized.__wrapped__
+            render(client, urls, 1)
+            plain = render(client, urls, args.repeat)
+            filters['datetime'] = memoized
+            memoized.cache_clear()
+            cached = render(client, urls, args.repeat)
+            print(f'{"render per page":>18}: plain {plain:7.2f} ms  '
+                  f'memoized {cached:7.2f} ms '
+                  f'(hits {memoized.cache_info().hits:,})')
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
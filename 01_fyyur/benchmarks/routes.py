@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Drives every route of the artist, venue and show blueprints at several
+database sizes and writes latency, throughput and query counts to JSON.
+
+Each scale seeds a fresh database with populate_synthetic, then requests
+every scenario below through the Flask test client, from --concurrency
+threads at once. Reads run first, then writes, then deletes, which remove
+rows seeded for them beyond those the reads use, and bulk deletes, which
+remove seeded rows with their shows. Every request is counted, failed ones
+included, and the number of failures is reported per route.
+
+The JSON keeps its keys sorted so that two runs diff cleanly; --compare
+prints the change in p95 latency and queries against an earlier run. The
+page cache is off unless --page-cache is given, so the routes themselves
+are measured.
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import app, page_cache
+from models.model import db
+from populate import populate_synthetic
+
+
+SCALES = {
+    'small': {'venues': 100, 'artists': 200, 'shows': 2000},
+    'medium': {'venues': 1000, 'artists': 2000, 'shows': 20000},
+    'large': {'venues': 10000, 'artists': 20000, 'shows': 200000},
+}
+BLUEPRINTS = ('artists', 'venues', 'shows')
+# Shows booked by the benchmark start here, clear of the seeded ones.
+BOOKING_EPOCH = datetime(2040, 1, 1, 20, 0)
+IMPORT_ROWS = 10
+# Rows removed by each bulk delete request.
+BULK_DELETE_ROWS = 10
+
+
+def _artist(i, scale):
+    return 1 + i % scale['artists']
+
+
+def _venue(i, scale):
+    return 1 + i % scale['venues']
+
+
+def _bulk_ids(i):
+    # Seeded rows with shows; deletes run last, so the reads are done.
+    return ','.join(str(id) for id in range(1 + i * BULK_DELETE_ROWS,
+                                            1 + (i + 1) * BULK_DELETE_ROWS))
+
+
+def _import_file(i, scale):
+    rows = ['artist_id,venue_id,start_time']
+    for row in range(i * IMPORT_ROWS, (i + 1) * IMPORT_ROWS):
+        start_time = BOOKING_EPOCH + timedelta(days=3650, hours=4 * row)
+        rows.append(f'{_artist(row, scale)},{_venue(row, scale)},'
+                    f'{start_time.isoformat()}')
+    return {'file': (io.BytesIO('\n'.join(rows).encode()), 'shows.csv')}
+
+
+# (endpoint, method, url, form data, phase); url and data take the request
+# number and the scale.
+SCENARIOS = [
+    ('artists.index', 'GET', lambda i, s: '/artists', None, 'read'),
+    ('artists.index', 'GET', lambda i, s: '/artists?sort=active', None,
+     'read'),
+    ('artists.page', 'GET', lambda i, s: '/artists/page?per_page=100', None,
+     'read'),
+    ('artists.search', 'POST', lambda i, s: '/artists/search',
+     lambda i, s: {'search_term': 'velvet crow'}, 'read'),
+    ('artists.view', 'GET', lambda i, s: f'/artists/{_artist(i, s)}', None,
+     'read'),
+    ('artists.edit_form', 'GET',
+     lambda i, s: f'/artists/{_artist(i, s)}/edit', None, 'read'),
+    ('artists.create_form', 'GET', lambda i, s: '/artists/create', None,
+     'read'),
+    ('venues.index', 'GET', lambda i, s: '/venues/', None, 'read'),
+    ('venues.index', 'GET', lambda i, s: '/venues/?page=1', None, 'read'),
+    ('venues.search', 'POST', lambda i, s: '/venues/search',
+     lambda i, s: {'search_term': 'velvet crow'}, 'read'),
+    ('venues.view', 'GET', lambda i, s: f'/venues/{_venue(i, s)}', None,
+     'read'),
+    ('venues.availability', 'GET',
+     lambda i, s: (f'/venues/{_venue(i, s)}/availability'
+                   f'?from=2030-01-01&to=2030-03-01'), None, 'read'),
+    ('venues.nearby', 'GET',
+     lambda i, s: '/venues/nearby?city=Austin&state=TX', None, 'read'),
+    ('venues.edit_form', 'GET',
+     lambda i, s: f'/venues/venues/{_venue(i, s)}/edit', None, 'read'),
+    ('venues.create_form', 'GET', lambda i, s: '/venues/create', None,
+     'read'),
+    ('shows.index', 'GET', lambda i, s: '/shows', None, 'read'),
+    ('shows.create_form', 'GET', lambda i, s: '/shows/create', None, 'read'),
+    ('artists.create', 'POST', lambda i, s: '/artists/create',
+     lambda i, s: {'name': f'Benchmark Artist {i}', 'city': 'Austin',
+                   'state': 'TX', 'genres': ['Jazz', 'Soul']}, 'write'),
+    ('artists.edit', 'POST', lambda i, s: f'/artists/{_artist(i, s)}/edit',
+     lambda i, s: {'name': f'Benchmark Artist {i}'}, 'write'),
+    ('venues.create', 'POST', lambda i, s: '/venues/create',
+     lambda i, s: {'name': f'Benchmark Venue {i}', 'city': 'Austin',
+                   'state': 'TX', 'genres': ['Jazz', 'Soul']}, 'write'),
+    ('venues.edit', 'POST',
+     lambda i, s: f'/venues/venues/{_venue(i, s)}/edit',
+     lambda i, s: {'name': f'Benchmark Venue {i}'}, 'write'),
+    ('shows.create', 'POST', lambda i, s: '/shows/create',
+     lambda i, s: {'artist_id': _artist(i, s), 'venue_id': _venue(i, s),
+                   'start_time': (BOOKING_EPOCH
+                                  + timedelta(hours=4 * i)).isoformat()},
+     'write'),
+    ('shows.bulk_import', 'POST', lambda i, s: '/shows/import', _import_file,
+     'write'),
+    ('artists.delete', 'DELETE',
+     lambda i, s: f'/artists/{s["artists"] + 1 + i}', None, 'delete'),
+    ('venues.delete', 'DELETE',
+     lambda i, s: f'/venues/{s["venues"] + 1 + i}', None, 'delete'),
+    ('artists.bulk_delete', 'DELETE',
+     lambda i, s: f'/artists?ids={_bulk_ids(i)}', None, 'delete'),
+    ('venues.bulk_delete', 'DELETE',
+     lambda i, s: f'/venues/?ids={_bulk_ids(i)}', None, 'delete'),
+]
+
+
+def check_coverage():
+    """Fails if a blueprint route has no scenario."""
+    routes = set(
+        (rule.endpoint, method)
+        for rule in app.url_map.iter_rules()
+        if rule.endpoint.split('.')[0] in BLUEPRINTS
+        for method in rule.methods - {'HEAD', 'OPTIONS'}
+    )
+    missing = routes - set(
+        (endpoint, method)
+        for endpoint, method, _, _, _ in SCENARIOS
+    )
+    if missing:
+        sys.exit('no benchmark scenario for: ' + ', '.join(
+            f'{method} {endpoint}' for endpoint, method in sorted(missing)
+        ))
+
+
+class QueryCounter():
+    """Counts the statements executed by an engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+def run_scenario(scenario, scale, requests, concurrency):
+    _, method, url, data, _ = scenario
+    latencies = []
+    failures = []
+    numbers = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                i = next(numbers, None)
+            if i is None:
+                return
+            kwargs = {'data': data(i, scale)} if data else {}
+            start = time.perf_counter()
+            response = client.open(url(i, scale), method=method, **kwargs)
+            elapsed = (time.perf_counter() - start) * 1000
+            response.close()
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    failures.append(response.status_code)
+
+    with QueryCounter(db.engine) as queries:
+        threads = [threading.Thread(target=worker)
+                   for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': requests,
+        'failures': len(failures),
+        'status': sorted(set(failures)),
+        'p50_ms': round(percentiles[49], 3),
+        'p95_ms': round(percentiles[94], 3),
+        'p99_ms': round(percentiles[98], 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'throughput_rps': round(requests / elapsed, 1),
+        'queries_per_request': round(queries.count / requests, 2),
+    }
+
+
+def run_scale(name, scale, args, directory):
+    app.config['SQLALCHEMY_DATABASE_URI'] = (
+        args.database_url or f'sqlite:///{directory}/{name}.db'
+    )
+    if not args.database_url:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'connect_args': {'check_same_thread': False, 'timeout': 30},
+        }
+    results = {}
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        start = time.perf_counter()
+        # Rows past the seeded counts are for the delete scenarios.
+        populate_synthetic(venues=scale['venues'] + args.requests,
+                           artists=scale['artists'] + args.requests,
+                           shows=scale['shows'])
+        seed_seconds = time.perf_counter() - start
+        page_cache.clear()
+        for phase in ('read', 'write', 'delete'):
+            for scenario in SCENARIOS:
+                endpoint, method, url, _, scenario_phase = scenario
+                if scenario_phase != phase:
+                    continue
+                result = run_scenario(scenario, scale, args.requests,
+                                      args.concurrency)
+                result['endpoint'] = endpoint
+                results[f'{method} {url(0, scale)}'] = result
+                print(f'{name:>6} {method:>6} {url(0, scale):<48} '
+                      f'p50 {result["p50_ms"]:8.2f}  '
+                      f'p95 {result["p95_ms"]:8.2f}  '
+                      f'p99 {result["p99_ms"]:8.2f} ms  '
+                      f'{result["throughput_rps"]:8.1f} req/s  '
+                      f'{result["queries_per_request"]:6.1f} queries'
+                      + (f'  {result["failures"]} failed'
+                         if result['failures'] else ''))
+        dialect = db.engine.dialect.name
+        db.session.remove()
+        db.drop_all()
+    return {
+        'seed': dict(scale, seconds=round(seed_seconds, 2)),
+        'dialect': dialect,
+        'routes': results,
+    }
+
+
+def compare(baseline, report):
+    for name, scale in report['scales'].items():
+        before = baseline.get('scales', {}).get(name, {}).get('routes', {})
+        for route, result in scale['routes'].items():
+            if route not in before:
+                continue
+            old = before[route]
+            change = (result['p95_ms'] / old['p95_ms'] - 1) * 100 \
+                if old['p95_ms'] else 0.0
+            print(f'{name:>6} {route:<55} p95 {old["p95_ms"]:8.2f} -> '
+                  f'{result["p95_ms"]:8.2f} ms ({change:+6.1f}%)  queries '
+                  f'{old["queries_per_request"]:6.1f} -> '
+                  f'{result["queries_per_request"]:6.1f}')
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scales', default='small,medium',
+                        help=f'any of {", ".join(SCALES)}')
+    parser.add_argument('--requests', type=int, default=50,
+                        help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--page-cache', action='store_true')
+    parser.add_argument('--output', default='benchmark-routes.json')
+    parser.add_argument('--compare', metavar='JSON',
+                        help='an earlier output to compare against')
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a temporary SQLite database')
+    args = parser.parse_args()
+    check_coverage()
+
+    app.config.update(
+        PAGE_CACHE=args.page_cache,
+        # Report failing routes instead of stopping at the first one.
+        PROPAGATE_EXCEPTIONS=False,
+        QUERY_PROFILING=False,
+    )
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'page_cache': args.page_cache,
+        'scales': {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.scales.split(','):
+            report['scales'][name] = run_scale(name, SCALES[name], args,
+                                               directory)
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+        file.write('\n')
+    print(f'wrote {args.output}')
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Compares indexed artist search against an unindexed ILIKE scan of the
+same columns, fetching as many artists."""
+import argparse
+import statistics
+import tempfile
+import time
+
+from app import app
+from models.artist import Artist
+from models.model import db
+from populate import populate_synthetic
+
+
+TERMS = ['velvet', 'crow quartet', 'seattle', 'soul', 'harb', 'nothing here',
+         'lantern oak', 'ivory owl duo']
+
+
+def unindexed_search(term, limit):
+    return Artist.query.filter(Artist._like_filter(term)).limit(limit).all()
+
+
+def measure(search, repeat, limit):
+    timings = []
+    for _ in range(repeat):
+        for term in TERMS:
+            start = time.perf_counter()
+            search(term, limit)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a temporary SQLite database')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app.config['SQLALCHEMY_DATABASE_URI'] = (
+            args.database_url or f'sqlite:///{directory}/bench.db'
+        )
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            start = time.perf_counter()
+            populate_synthetic(artists=args.rows)
+            print(f'seeded {args.rows} artists in '
+                  f'{time.perf_counter() - start:.1f}s')
+            for label, search in (('indexed', Artist.search),
+                                  ('ilike scan', unindexed_search)):
+                result = measure(search, args.repeat, args.limit)
+                print(f'{label:>10}: p50 {result["p50"]:8.2f} ms  '
+                      f'p95 {result["p95"]:8.2f} ms')
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Measures bulk CSV show import throughput against the form path, which
+parsed, inserted and committed one show at a time."""
+import argparse
+import io
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from app import app
+from models.model import db
+from models.show import Show
+from populate import populate_synthetic
+from show_import import import_shows
+
+
+def generate_csv(rows, venues, artists, seed=0, invalid=0.01):
+    """Returns a season schedule with about invalid of its rows rejected."""
+    rng = random.Random(seed)
+    buffer = io.StringIO()
+    buffer.write('artist_id,venue_id,start_time\n')
+    for _ in range(rows):
+        artist_id = rng.randint(1, artists)
+        if rng.random() < invalid:
+            artist_id = artists + 1
+        day = rng.randint(1, 28)
+        buffer.write(f'{artist_id},{rng.randint(1, venues)},'
+                     f'2030-{rng.randint(1, 12):02}-{day:02} 20:00:00\n')
+    buffer.seek(0)
+    return buffer
+
+
+def per_row_import(lines):
+    """The old show_blueprint.create path, once per row."""
+    next(lines)
+    for line in lines:
+        artist_id, venue_id, start_time = line.rstrip('\n').split(',')
+        start_time = datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S')
+        try:
+            Show(artist_id=artist_id, venue_id=venue_id,
+                 start_time=start_time).insert()
+        except Exception:
+            db.session.rollback()
+
+
+def clear_shows():
+    db.session.query(Show).delete()
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--per-row-rows', type=int, default=2000,
+                        help='rows imported one at a time, which is slow')
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--batch-sizes', default='100,1000,5000')
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a temporary SQLite database')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app.config['SQLALCHEMY_DATABASE_URI'] = (
+            args.database_url or f'sqlite:///{directory}/bench.db'
+        )
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            populate_synthetic(venues=args.venues, artists=args.artists)
+
+            start = time.perf_counter()
+            per_row_import(generate_csv(args.per_row_rows, args.venues,
+                                        args.artists))
+            elapsed = time.perf_counter() - start
+            print(f'{"per row":>12}: {args.per_row_rows / elapsed:10,.0f} '
+                  f'rows/s ({args.per_row_rows:,} rows)')
+            clear_shows()
+
+            for batch_size in map(int, args.batch_sizes.split(',')):
+                result = import_shows(
+                    generate_csv(args.rows, args.venues, args.artists),
+                    batch_size=batch_size
+                )
+                print(f'{f"batch {batch_size}":>12}: '
+                      f'{result.rows_per_second:10,.0f} rows/s '
+                      f'({result.imported:,} imported, '
+                      f'{len(result.rejected):,} rejected)')
+                clear_shows()
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Compares writing rows one commit at a time through Model.insert against
+batching them in Model.unit_of_work blocks."""
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app import app
+from models.model import Model, db
+from models.show import Show
+from models.venue import Venue
+from populate import populate_synthetic
+
+
+def make_shows(rng, count, venues, artists):
+    # A slot of its own for every show keeps them clear of each other.
+    epoch = datetime.now()
+    return [
+        Show(venue_id=rng.randint(1, venues),
+             artist_id=rng.randint(1, artists),
+             start_time=epoch + timedelta(hours=4 * slot))
+        for slot in range(-count // 2, count - count // 2)
+    ]
+
+
+def make_venues(rng, count):
+    return [
+        Venue(name=f'Venue {i}', city='Austin', state='TX',
+              seeking_talent=False,
+              genres=rng.sample(['Jazz', 'Folk', 'Soul', 'Blues'], 2))
+        for i in range(count)
+    ]
+
+
+def insert(objects, batch_size):
+    start = time.perf_counter()
+    if batch_size == 1:
+        for object in objects:
+            object.insert()
+    else:
+        for offset in range(0, len(objects), batch_size):
+            with Model.unit_of_work():
+                for object in objects[offset:offset + batch_size]:
+                    object.insert()
+    return len(objects) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--venues', type=int, default=500)
+    parser.add_argument('--artists', type=int, default=1000)
+    parser.add_argument('--batch-sizes', default='1,100,1000')
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a temporary SQLite database')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app.config['SQLALCHEMY_DATABASE_URI'] = (
+            args.database_url or f'sqlite:///{directory}/bench.db'
+        )
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            populate_synthetic(venues=args.venues, artists=args.artists)
+            for batch_size in map(int, args.batch_sizes.split(',')):
+                rng = random.Random(0)
+                label = 'per row' if batch_size == 1 else f'batch {batch_size}'
+                shows = insert(make_shows(rng, args.rows, args.venues,
+                                          args.artists), batch_size)
+                venues = insert(make_venues(rng, args.rows // 10), batch_size)
+                print(f'{label:>10}: shows {shows:9,.0f} rows/s  '
+                      f'venues {venues:9,.0f} rows/s')
+                db.session.query(Show).delete()
+                db.session.commit()
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Fails if a hot Fyyur query falls back to a sequential scan.
+
+Every hot route is requested through the Flask test client against a
+seeded database. The SQL it issues is captured from the engine and run
+again under EXPLAIN, and any full scan of a table not listed as allowed
+is reported. Exits with status 1 if any such scan is found.
+"""
+import argparse
+import json
+import re
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from app import app
+from models.model import db
+from populate import populate_synthetic
+
+
+# Lookup tables small enough that scanning them is always the right plan.
+ALWAYS_ALLOWED = {'genre'}
+
+NEXT_MONTH = f'from={date.today()}&to={date.today() + timedelta(days=30)}'
+
+# (method, url, form data, tables this route may scan)
+HOT_ROUTES = [
+    ('GET', '/venues/1', None, set()),
+    ('GET', '/artists/1', None, set()),
+    ('GET', '/shows', None, set()),
+    ('GET', f'/venues/1/availability?{NEXT_MONTH}', None, set()),
+    ('GET', '/venues/nearby?city=Austin&state=TX', None, set()),
+    ('GET', '/artists', None, set()),
+    ('GET', '/artists?sort=active', None, set()),
+    ('GET', '/artists?genre=Jazz', None, set()),
+    ('GET', '/venues/?genre=Jazz', None, set()),
+    ('POST', '/artists/search', {'search_term': 'velvet crow'}, set()),
+    ('POST', '/venues/search', {'search_term': 'velvet crow'}, set()),
+]
+
+# Full scans read 'SCAN <table or alias>' without a USING INDEX clause.
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: LEFT-JOIN)?$')
+SQLITE_ALIAS = re.compile(r'_\d+$')
+
+
+def seed(venues, artists, shows):
+    """Fills the database with synthetic rows and refreshes the planner
+    statistics."""
+    populate_synthetic(venues=venues, artists=artists, shows=shows)
+    db.session.execute('ANALYZE')
+    db.session.commit()
+
+
+def capture(client, method, url, data):
+    """Requests a route and returns the statements it executed."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, many):
+        if not many:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.open(url, method=method, data=data)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    if response.status_code != 200:
+        raise RuntimeError(f'{method} {url} returned {response.status_code}')
+    return statements
+
+
+def postgresql_scans(connection, statement, parameters):
+    plan = connection.exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {statement}', parameters
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            yield node['Relation Name']
+        nodes.extend(node.get('Plans', []))
+
+
+def sqlite_scans(connection, statement, parameters):
+    rows = connection.exec_driver_sql(
+        f'EXPLAIN QUERY PLAN {statement}', parameters
+    )
+    tables = set(db.metadata.tables)
+    for row in rows:
+        match = SQLITE_SCAN.match(row[-1])
+        if not match:
+            continue
+        name = match.group(1)
+        if name not in tables:
+            name = SQLITE_ALIAS.sub('', name)
+        if name in tables:
+            yield name
+
+
+def check(verbose=False):
+    """Returns a list of (route, table, statement) full scans."""
+    explain = {
+        'postgresql': postgresql_scans,
+        'sqlite': sqlite_scans,
+    }[db.engine.dialect.name]
+    client = app.test_client()
+    failures = []
+    for method, url, data, allowed in HOT_ROUTES:
+        route = f'{method} {url}'
+        with db.engine.connect() as connection:
+            for statement, parameters in capture(client, method, url, data):
+                if not statement.lstrip().upper().startswith('SELECT'):
+                    continue
+                for table in explain(connection, statement, parameters):
+                    if table in allowed or table in ALWAYS_ALLOWED:
+                        continue
+                    failures.append((route, table, statement))
+        if verbose:
+            print(f'checked {route}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a temporary SQLite database; '
+                             'its tables are dropped and reseeded')
+    parser.add_argument('--venues', type=int, default=2000)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=50000)
+    parser.add_argument('--no-seed', action='store_true',
+                        help='check an already seeded database')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app.config['SQLALCHEMY_DATABASE_URI'] = (
+            args.database_url or f'sqlite:///{directory}/plans.db'
+        )
+        with app.app_context():
+            if not args.no_seed:
+                db.drop_all()
+                db.create_all()
+                seed(args.venues, args.artists, args.shows)
+            failures = check(args.verbose)
+            db.session.remove()
+
+    for route, table, statement in failures:
+        print(f'{route}: sequential scan on {table}\n  {statement}\n')
+    if failures:
+        sys.exit(1)
+    print('No sequential scans in hot queries.')
+
+
+if __name__ == '__main__':
+    main()
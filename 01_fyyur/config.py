@@ -8,3 +8,53 @@ FLASK_ENV = 'development'
 SERVER_NAME = 'pythondev.local:5000'
 SQLALCHEMY_DATABASE_URI = 'postgres://jsmith@localhost:5432/fyyur'
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+# Connection pool of each worker process; see db_pool.py.
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+    'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    'pool_pre_ping': True,
+}
+AREAS_PER_PAGE = 10
+ARTISTS_PER_PAGE = 50
+ARTISTS_PER_PAGE_MAX = 200
+SHOWS_PER_PAGE = 20
+NEARBY_VENUES = 10
+NEARBY_VENUES_MAX = 50
+# Most artists or venues one bulk delete request may remove.
+BULK_DELETE_MAX = 1000
+# Longest date range a venue availability request may cover.
+AVAILABILITY_MAX_DAYS = 92
+# Send listing pages to the client as they render instead of all at once.
+STREAM_TEMPLATES = False
+# Most results an artist or venue search returns.
+SEARCH_LIMIT = 50
+# Time every SQL statement per request; see profiler.py.
+QUERY_PROFILING = os.environ.get('QUERY_PROFILING', 'false').lower() == 'true'
+SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 100))
+# Share the page cache between processes, e.g. redis://localhost:6379/0
+PAGE_CACHE_REDIS_URL = os.environ.get('PAGE_CACHE_REDIS_URL')
+# Cache rendered listing and detail pages; see page_cache.py. Without Redis
+# the cache is kept per process and only sees the writes of that process,
+# so it is only on by default when it is shared.
+PAGE_CACHE = os.environ.get(
+    'PAGE_CACHE', 'true' if PAGE_CACHE_REDIS_URL else 'false'
+).lower() == 'true'
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 60))
+PAGE_CACHE_MAX_ENTRIES = 1000
+SHOW_IMPORT_BATCH_SIZE = 1000
+# Background jobs run by `flask run-jobs`; see jobs.py.
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_POLL_SECONDS = 1.0
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_SECONDS = 10
+JOB_LOCK_SECONDS = 300
+# Bytecode cached templates and fingerprinted static files; see rendering.py.
+PRODUCTION_RENDERING = (
+    os.environ.get('PRODUCTION_RENDERING', 'false').lower() == 'true'
+)
+TEMPLATE_CACHE_DIR = os.environ.get(
+    'TEMPLATE_CACHE_DIR', os.path.join(basedir, '.template_cache')
+)
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
@@ -1,10 +1,10 @@
-from datetime import datetime
-from flask import Blueprint, redirect, render_template, request, session, url_for
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, session, url_for
 
 from forms import *
+from controllers.bulk_delete import bulk_delete_ids
 from models.artist import Artist
-from models.show import Show
-from models.venue import Venue
+from models.model import db
+from page_cache import cached_page
 
 artist_blueprint = Blueprint(
     'artists',
@@ -13,46 +13,59 @@ artist_blueprint = Blueprint(
 )
 
 
+def fetch_page():
+    """Fetches the page of artists named by the query string."""
+    per_page = min(
+        request.args.get('per_page', current_app.config['ARTISTS_PER_PAGE'],
+                         type=int),
+        current_app.config['ARTISTS_PER_PAGE_MAX']
+    )
+    if per_page < 1:
+        abort(400)
+    try:
+        return Artist.fetch_page(
+            after=request.args.get('after'),
+            per_page=per_page,
+            genre=request.args.get('genre'),
+            most_active=request.args.get('sort') == 'active'
+        )
+    except ValueError:
+        abort(400)
+
 @artist_blueprint.route('')
+@cached_page('artist')
 def index():
-    return render_template(
-        'pages/artists.html',
-        artists=Artist.query.order_by('name').all()
-    )
+    return render_template('pages/artists.html', artists=fetch_page())
+
+@artist_blueprint.route('/page')
+def page():
+    artists = fetch_page()
+    data = [{'id': artist.id, 'name': artist.name} for artist in artists]
+    next_url = None
+    if artists.next_cursor:
+        next_url = url_for('artists.page',
+                           **{**request.args, 'after': artists.next_cursor})
+    return jsonify({
+        'data': data,
+        'next_cursor': artists.next_cursor,
+        'next': next_url,
+    })
 
 @artist_blueprint.route('/search', methods=['POST'])
 def search():
-    query = request.form.get('search_term')
-    artists = Artist.query.filter(Artist.name.ilike(f'%{query}%')).all()
+    artists = Artist.search(
+        request.form.get('search_term', ''),
+        limit=current_app.config['SEARCH_LIMIT']
+    )
     response = {'count': len(artists), 'data': artists,}
     return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
 @artist_blueprint.route('/<int:artist_id>')
+@cached_page('artist:{artist_id}')
 def view(artist_id):
-    current_time = datetime.now()
-    artist = Artist.query.get(artist_id)
-    setattr(artist, 'past_shows', [])
-    setattr(artist, 'upcoming_shows', [])
-
-    for show in artist.shows:
-        venue = Venue.query.get(show.venue_id)
-        show_details = {
-            'venue_id': show.venue_id,
-            'venue_name': venue.name,
-            'venue_image_link': venue.image_link,
-            'start_time': show.start_time,
-        }
-        if show.start_time < current_time:
-            artist.past_shows.append(show_details)
-        else:
-            artist.upcoming_shows.append(show_details)
-
-    setattr(artist, 'past_shows_count', len(artist.past_shows))
-    setattr(artist, 'upcoming_shows_count', len(artist.upcoming_shows))
-
     return render_template(
         'pages/show_artist.html',
-        artist=artist
+        artist=Artist.fetch_with_shows(artist_id)
     )
 
 #  Update
@@ -81,7 +94,7 @@ def edit(artist_id):
     # TODO: take values from the form submitted, and update existing
     # artist record with ID <artist_id> using the new attributes
 
-    return redirect(url_for('artist.view', artist_id=artist_id))
+    return redirect(url_for('artists.view', artist_id=artist_id))
 
 
 #  Create Artist
@@ -95,10 +108,11 @@ def create_form():
 @artist_blueprint.route('/create', methods=['POST'])
 def create():
     error = False
-    venue = Artist(**request.form)
+    data = request.form.to_dict()
+    data['genres'] = request.form.getlist('genres')
 
     try:
-        artist = Artist(**request.form)
+        artist = Artist(**data)
         if artist.seeking_venue == 'y':
             artist.seeking_venue = True
         else:
@@ -107,7 +121,7 @@ def create():
     except Exception as e:
         error = True
         db.session.rollback()
-        print(f'Exception ==> {e}')
+        current_app.logger.exception(e)
     finally:
         db.session.close()
 
@@ -131,7 +145,7 @@ def delete(artist_id):
         artist.delete()
     except Exception as e:
         error = True
-        print(f'Exception ==> {e}')
+        current_app.logger.exception(e)
         db.session.rollback()
     finally:
         db.session.close()
@@ -144,3 +158,15 @@ def delete(artist_id):
         flash(f'Artist {artist_id} was successfully deleted.')
 
     return redirect(url_for('index'))
+
+@artist_blueprint.route('', methods=['DELETE'])
+def bulk_delete():
+    """Deletes many artists, and their shows, in one statement."""
+    ids = bulk_delete_ids()
+    try:
+        deleted = Artist.delete_all(ids)
+    except Exception as e:
+        current_app.logger.exception(e)
+        db.session.rollback()
+        abort(500)
+    return jsonify({'deleted': deleted})
@@ -0,0 +1,17 @@
+from flask import abort, current_app, request
+
+
+def bulk_delete_ids():
+    """Reads the ids of a bulk delete from a JSON body, {"ids": [...]}, or
+    from ?ids=1,2,3."""
+    body = request.get_json(silent=True)
+    try:
+        if body is not None:
+            ids = [int(id) for id in body['ids']]
+        else:
+            ids = [int(id) for id in request.args['ids'].split(',')]
+    except (KeyError, TypeError, ValueError):
+        abort(400)
+    if not 0 < len(ids) <= current_app.config['BULK_DELETE_MAX']:
+        abort(400)
+    return ids
@@ -1,9 +1,11 @@
-from flask import Blueprint, redirect, render_template, request, session, url_for
+import io
+
+from flask import Blueprint, Response, abort, current_app, flash, jsonify, render_template, request, session, stream_template
 
 from forms import *
-from models.artist import Artist
-from models.show import Show
-from models.venue import Venue
+from models.model import db
+from models.show import MAX_SHOW_LENGTH, BookingConflict, Show
+from show_import import import_shows, parse_start_time
 
 show_blueprint = Blueprint(
     'shows',
@@ -14,13 +16,16 @@ show_blueprint = Blueprint(
 
 @show_blueprint.route('')
 def index():
-    shows = Show.query.all()
-    for show in shows:
-        show.venue_name = Venue.query.get(show.venue_id).name
-        artist = Artist.query.get(show.artist_id)
-        show.artist_name = artist.name
-        show.artist_image_link = artist.image_link
+    try:
+        shows = Show.fetch_page(
+            after=request.args.get('after'),
+            per_page=current_app.config['SHOWS_PER_PAGE']
+        )
+    except ValueError:
+        abort(400)
 
+    if current_app.config['STREAM_TEMPLATES']:
+        return Response(stream_template('pages/shows.html', shows=shows))
     return render_template('pages/shows.html', shows=shows)
 
 @show_blueprint.route('/create')
@@ -32,25 +37,66 @@ def create_form():
 @show_blueprint.route('/create', methods=['POST'])
 def create():
     error = False
+    conflict = None
 
     data = request.form.to_dict()
-    format = '%Y-%m-%d %H:%M:%S'
-    data['start_time'] = datetime.strptime(data['start_time'], format)
 
     try:
-        show = Show(**data)
-        show.insert()
+        artist_id = int(data.get('artist_id'))
+        venue_id = int(data.get('venue_id'))
+        start_time = parse_start_time(data.get('start_time'))
+        end_time = (parse_start_time(data['end_time'])
+                    if data.get('end_time') else None)
+    except (TypeError, ValueError):
+        flash('The show could not be listed. Artist and venue ids must be '
+              'numbers and times dates like 2030-05-01 20:00.', 'error')
+        return render_template('pages/home.html')
+    if (end_time is not None
+            and not start_time < end_time <= start_time + MAX_SHOW_LENGTH):
+        flash(f'The show could not be listed. A show must end after it '
+              f'starts and last at most '
+              f'{MAX_SHOW_LENGTH.total_seconds() / 3600:g} hours.', 'error')
+        return render_template('pages/home.html')
+
+    try:
+        Show.book(
+            artist_id=artist_id,
+            venue_id=venue_id,
+            start_time=start_time,
+            end_time=end_time
+        )
+    except BookingConflict as e:
+        error = True
+        conflict = str(e)
+        db.session.rollback()
     except Exception as e:
         error = True
         db.session.rollback()
-        print(f'Exception ==> {e}')
+        current_app.logger.exception(e)
     finally:
         db.session.close()
 
-    if error:
+    if conflict:
+        flash(f'The show could not be listed. {conflict}', 'error')
+    elif error:
         flash('An error occurred and the show could not be listed.', 'error')
     else:
         flash('The show was successfully listed.')
 
     return render_template('pages/home.html')
 
+
+@show_blueprint.route('/import', methods=['POST'])
+def bulk_import():
+    upload = request.files.get('file')
+    if upload is None:
+        abort(400)
+    lines = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+    try:
+        result = import_shows(
+            lines,
+            batch_size=current_app.config['SHOW_IMPORT_BATCH_SIZE']
+        )
+    except (UnicodeDecodeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result.to_dict())
@@ -1,9 +1,14 @@
-from flask import Blueprint, redirect, render_template, request, session, url_for
+from datetime import datetime, timedelta
+
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, session, url_for
 
 from forms import *
-from models.artist import Artist
+from controllers.bulk_delete import bulk_delete_ids
+from models.geo import geocode
+from models.model import db
 from models.show import Show
 from models.venue import Venue
+from page_cache import cached_page
 
 venue_blueprint = Blueprint(
     'venues',
@@ -13,58 +18,105 @@ venue_blueprint = Blueprint(
 
 
 @venue_blueprint.route('/')
+@cached_page('venue')
 def index():
-    venues = Venue.query.all()
-    locations = set((venue.city, venue.state) for venue in venues)
-    areas = [
-        {
-            'city': location[0],
-            'state': location[1],
-            'venues': Venue.query
-                           .filter(Venue.city == location[0])
-                           .filter(Venue.state == location[1])
-                           .all()
-        }
-        for location
-        in locations
-    ]
+    try:
+        areas = Venue.fetch_areas(
+            page=request.args.get('page', type=int),
+            per_page=current_app.config['AREAS_PER_PAGE'],
+            genre=request.args.get('genre'),
+            most_active=request.args.get('sort') == 'active'
+        )
+    except ValueError:
+        abort(400)
     return render_template('pages/venues.html', areas=areas)
 
 @venue_blueprint.route('/search', methods=['POST'])
 def search():
-    query = request.form.get('search_term')
-    venues = Venue.query.filter(Venue.name.ilike(f'%{query}%')).all()
+    venues = Venue.search(
+        request.form.get('search_term', ''),
+        limit=current_app.config['SEARCH_LIMIT']
+    )
     response = {'count': len(venues), 'data': venues,}
     return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
 @venue_blueprint.route('/<int:venue_id>')
+@cached_page('venue:{venue_id}')
 def view(venue_id):
-    current_time = datetime.now()
-    venue = Venue.query.get(venue_id)
-    setattr(venue, 'past_shows', [])
-    setattr(venue, 'upcoming_shows', [])
-
-    for show in venue.shows:
-        artist = Artist.query.get(show.artist_id)
-        show_details = {
-            'artist_id': show.artist_id,
-            'artist_name': artist.name,
-            'artist_image_link': artist.image_link,
-            'start_time': show.start_time,
-        }
-        if show.start_time < current_time:
-            venue.past_shows.append(show_details)
-        else:
-            venue.upcoming_shows.append(show_details)
-
-    setattr(venue, 'past_shows_count', len(venue.past_shows))
-    setattr(venue, 'upcoming_shows_count', len(venue.upcoming_shows))
-
     return render_template(
         'pages/show_venue.html',
-        venue=Venue.query.get(venue_id)
+        venue=Venue.fetch_with_shows(venue_id)
     )
 
+@venue_blueprint.route('/<int:venue_id>/availability')
+def availability(venue_id):
+    try:
+        start_time = datetime.fromisoformat(request.args['from'])
+        end_time = datetime.fromisoformat(request.args['to'])
+    except (KeyError, ValueError):
+        abort(400)
+    max_days = timedelta(days=current_app.config['AVAILABILITY_MAX_DAYS'])
+    if not start_time < end_time <= start_time + max_days:
+        abort(400)
+    slots = Show.free_slots(
+        venue_id,
+        start_time,
+        end_time,
+        min_length=timedelta(
+            minutes=request.args.get('min_minutes', 0, type=int)
+        )
+    )
+    return jsonify({
+        'venue_id': venue_id,
+        'from': start_time.isoformat(),
+        'to': end_time.isoformat(),
+        'free': [
+            {'start': start.isoformat(), 'end': end.isoformat()}
+            for start, end
+            in slots
+        ],
+    })
+
+@venue_blueprint.route('/nearby')
+def nearby():
+    if 'city' in request.args:
+        coordinates = geocode(request.args['city'], request.args.get('state'))
+        if coordinates is None:
+            abort(404)
+        latitude, longitude = coordinates
+    else:
+        latitude = request.args.get('lat', type=float)
+        longitude = request.args.get('lng', type=float)
+        if (latitude is None or longitude is None
+                or not -90 <= latitude <= 90
+                or not -180 <= longitude <= 180):
+            abort(400)
+    k = request.args.get('k', current_app.config['NEARBY_VENUES'], type=int)
+    if k < 1:
+        abort(400)
+    venues = Venue.nearest(
+        latitude,
+        longitude,
+        k=min(k, current_app.config['NEARBY_VENUES_MAX'])
+    )
+    return jsonify({
+        'latitude': latitude,
+        'longitude': longitude,
+        'data': [
+            {
+                'id': venue.id,
+                'name': venue.name,
+                'city': venue.city,
+                'state': venue.state,
+                'latitude': venue.latitude,
+                'longitude': venue.longitude,
+                'distance_km': round(distance, 3),
+            }
+            for venue, distance
+            in venues
+        ],
+    })
+
 #  Create Venue
 #  ----------------------------------------------------------------
 
@@ -76,10 +128,11 @@ def create_form():
 @venue_blueprint.route('/create', methods=['POST'])
 def create():
     error = False
-    venue = Venue(**request.form)
+    data = request.form.to_dict()
+    data['genres'] = request.form.getlist('genres')
 
     try:
-        venue = Venue(**request.form)
+        venue = Venue(**data)
         if venue.seeking_talent == 'y':
             venue.seeking_talent = True
         else:
@@ -88,7 +141,7 @@ def create():
     except Exception as e:
         error = True
         db.session.rollback()
-        print(f'Exception ==> {e}')
+        current_app.logger.exception(e)
     finally:
         db.session.close()
 
@@ -112,7 +165,7 @@ def delete(venue_id):
         venue.delete()
     except Exception as e:
         error = True
-        print(f'Exception ==> {e}')
+        current_app.logger.exception(e)
         db.session.rollback()
     finally:
         db.session.close()
@@ -126,6 +179,18 @@ def delete(venue_id):
 
     return redirect(url_for('index'))
 
+@venue_blueprint.route('/', methods=['DELETE'])
+def bulk_delete():
+    """Deletes many venues, and their shows, in one statement."""
+    ids = bulk_delete_ids()
+    try:
+        deleted = Venue.delete_all(ids)
+    except Exception as e:
+        current_app.logger.exception(e)
+        db.session.rollback()
+        abort(500)
+    return jsonify({'deleted': deleted})
+
 @venue_blueprint.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_form(venue_id):
     form = VenueForm()
@@ -150,4 +215,4 @@ def edit_form(venue_id):
 def edit(venue_id):
     # TODO: take values from the form submitted, and update existing
     # venue record with ID <venue_id> using the new attributes
-    return redirect(url_for('show_venue', venue_id=venue_id))
+    return redirect(url_for('venues.view', venue_id=venue_id))
@@ -0,0 +1,94 @@
+"""Connection pool sizing and instrumentation.
+
+Server databases get an InstrumentedQueuePool sized by the pool options in
+SQLALCHEMY_ENGINE_OPTIONS, which records how long each checkout waited for
+a connection and how many gave up after pool_timeout. SQLite keeps the
+static or null pool it is given, which takes no sizing, unless a queue pool
+is configured explicitly.
+
+Every worker process has its own pool, so a deployment can open up to
+workers * (pool_size + max_overflow) connections; keep that below the
+max_connections of the server.
+"""
+import threading
+import time
+
+import flask_sqlalchemy
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+POOL_SIZING = ('pool_size', 'max_overflow', 'pool_timeout')
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A QueuePool recording how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_checked_out = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            self.peak_checked_out = max(self.peak_checked_out,
+                                        self.checkedout())
+        return connection
+
+
+class SQLAlchemy(flask_sqlalchemy.SQLAlchemy):
+    """Gives server databases an instrumented, sized connection pool."""
+
+    def create_engine(self, sa_url, engine_opts):
+        options = dict(engine_opts)
+        poolclass = options.get('poolclass')
+        if poolclass is None and not sa_url.drivername.startswith('sqlite'):
+            options['poolclass'] = InstrumentedQueuePool
+        elif poolclass is None or not issubclass(poolclass, QueuePool):
+            for key in POOL_SIZING:
+                options.pop(key, None)
+        return super().create_engine(sa_url, options)
+
+
+def pool_stats(engine):
+    """Describes the state of the connection pool of engine."""
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    if not isinstance(pool, QueuePool):
+        return stats
+    stats.update({
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'max_overflow': pool._max_overflow,
+    })
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            checkouts = pool.checkouts
+            stats.update({
+                'peak_checked_out': pool.peak_checked_out,
+                'checkouts': checkouts,
+                'timeouts': pool.timeouts,
+                'wait_ms_mean': round(
+                    pool.wait_seconds * 1000 / checkouts if checkouts else 0,
+                    3
+                ),
+                'wait_ms_max': round(pool.max_wait_seconds * 1000, 3),
+            })
+    return stats
@@ -0,0 +1,252 @@
+"""Background jobs for the Fyyur app, queued in the database.
+
+Model.defer adds a row to the job table in the transaction of the write
+that needs it, so a job exists exactly when that write commits and no
+broker is involved. Workers, started with `flask run-jobs`, claim due jobs
+with a conditional update (and SKIP LOCKED on PostgreSQL), so any number of
+worker threads and processes can share the table, and run them on a thread
+pool of JOB_WORKERS threads.
+
+A job that raises is retried after JOB_RETRY_SECONDS, doubling with every
+attempt, and after JOB_MAX_ATTEMPTS attempts it is moved to the dead_job
+table with its last error; `flask requeue-dead-jobs` queues dead jobs
+again. Jobs left running longer than JOB_LOCK_SECONDS, e.g. by a worker
+that was killed, are queued again. /stats/jobs reports the queue depth.
+
+Tasks are functions registered with @task and take the payload as keyword
+arguments, so payloads must be JSON serializable. Tasks may run more than
+once and should be idempotent.
+
+Tasks invalidate the cached pages of what they write, but the page cache is
+only shared with the web server through PAGE_CACHE_REDIS_URL. With the
+default in-process cache, `flask run-jobs` invalidates its own empty cache,
+and pages showing e.g. show counters a job refreshed stay stale for up to
+PAGE_CACHE_TTL seconds; run-jobs warns about it.
+"""
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+
+from models.artist import Artist
+from models.job import DeadJob, Job
+from models.model import db
+from models.venue import Venue
+from page_cache import invalidate
+
+
+TASKS = {}
+
+
+def task(name):
+    """Registers a function as the task called name."""
+    def register(function):
+        TASKS[name] = function
+        return function
+    return register
+
+
+@task('refresh_show_counters')
+def refresh_show_counters(table, ids):
+    model = {'artist': Artist, 'venue': Venue}[table]
+    model.refresh_show_counters(ids)
+    db.session.commit()
+    invalidate(table, *(f'{table}:{id}' for id in ids))
+
+
+class JobQueue():
+    """Flask extension claiming and running queued jobs.
+
+    Cache invalidations made by jobs only reach the web server when the page
+    cache is shared through PAGE_CACHE_REDIS_URL.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.counters = {'succeeded': 0, 'retried': 0, 'buried': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOB_WORKERS', 2)
+        app.config.setdefault('JOB_POLL_SECONDS', 1.0)
+        app.config.setdefault('JOB_MAX_ATTEMPTS', 5)
+        app.config.setdefault('JOB_RETRY_SECONDS', 10)
+        app.config.setdefault('JOB_LOCK_SECONDS', 300)
+        self.app = app
+
+        @app.cli.command('run-jobs')
+        @click.option('--once', is_flag=True,
+                      help='Run the jobs due now and exit.')
+        def run_jobs(once):
+            """Runs queued background jobs."""
+            if (app.config.get('PAGE_CACHE')
+                    and not app.config.get('PAGE_CACHE_REDIS_URL')):
+                click.echo('warning: PAGE_CACHE_REDIS_URL is not set, so '
+                           'pages the jobs change stay cached for up to '
+                           f'{app.config["PAGE_CACHE_TTL"]} seconds', err=True)
+            if once:
+                click.echo(f'ran {self.run_pending():,} jobs')
+                return
+            click.echo(f'running jobs on {app.config["JOB_WORKERS"]} threads')
+            try:
+                self.work()
+            except KeyboardInterrupt:
+                pass
+
+        @app.cli.command('requeue-dead-jobs')
+        def requeue_dead_jobs():
+            """Queues the jobs in the dead_job table again."""
+            click.echo(f'requeued {self.requeue_dead():,} jobs')
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def claim(self, limit):
+        """Marks up to limit due jobs as running and returns their ids."""
+        config = self.app.config
+        now = datetime.utcnow()
+        db.session.query(Job).filter(
+            Job.status == 'running',
+            Job.locked_at < now - timedelta(seconds=config['JOB_LOCK_SECONDS'])
+        ).update({'status': 'queued', 'locked_at': None},
+                 synchronize_session=False)
+        due = (
+            db.session.query(Job.id)
+              .filter(Job.status == 'queued', Job.run_at <= now)
+              .order_by(Job.run_at, Job.id)
+              .limit(limit)
+        )
+        if db.engine.dialect.name == 'postgresql':
+            due = due.with_for_update(skip_locked=True)
+        claimed = []
+        for (id,) in due.all():
+            # Another worker may have claimed the job since it was read.
+            if db.session.query(Job).filter(
+                Job.id == id,
+                Job.status == 'queued'
+            ).update({'status': 'running', 'locked_at': now},
+                     synchronize_session=False):
+                claimed.append(id)
+        db.session.commit()
+        return claimed
+
+    def run(self, job_id):
+        """Runs a claimed job, retrying or burying it if it fails."""
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return False
+        try:
+            function = TASKS[job.task]
+            function(**job.payload)
+            db.session.query(Job).filter(Job.id == job_id).delete()
+            db.session.commit()
+            self._count('succeeded')
+            return True
+        except Exception:
+            error = traceback.format_exc()
+            db.session.rollback()
+        job = db.session.get(Job, job_id)
+        if job is None:
+            # Deleted while it ran, e.g. by another worker that reclaimed it.
+            self.app.logger.warning(f'job {job_id} failed and is gone:\n'
+                                    f'{error}')
+            return False
+        self._fail(job, error)
+        return False
+
+    def _fail(self, job, error):
+        config = self.app.config
+        job.attempts += 1
+        self.app.logger.warning(f'job {job.id} {job.task} failed on attempt '
+                                f'{job.attempts}:\n{error}')
+        if job.attempts >= config['JOB_MAX_ATTEMPTS'] or job.task not in TASKS:
+            db.session.add(DeadJob(task=job.task, payload=job.payload,
+                                   attempts=job.attempts, error=error,
+                                   created_at=job.created_at))
+            db.session.delete(job)
+            self._count('buried')
+        else:
+            delay = config['JOB_RETRY_SECONDS'] * 2 ** (job.attempts - 1)
+            job.status = 'queued'
+            job.locked_at = None
+            job.last_error = error
+            job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+            self._count('retried')
+        db.session.commit()
+
+    def run_pending(self, limit=100):
+        """Runs the jobs due now in this thread and returns how many."""
+        ran = 0
+        while True:
+            claimed = self.claim(limit)
+            for job_id in claimed:
+                self.run(job_id)
+            ran += len(claimed)
+            if len(claimed) < limit:
+                return ran
+
+    def _run_in_context(self, job_id):
+        with self.app.app_context():
+            try:
+                self.run(job_id)
+            finally:
+                db.session.remove()
+
+    def work(self, stop=None):
+        """Runs jobs on a pool of JOB_WORKERS threads until stop is set."""
+        config = self.app.config
+        stop = stop or threading.Event()
+        with ThreadPoolExecutor(config['JOB_WORKERS']) as pool:
+            while not stop.is_set():
+                with self.app.app_context():
+                    claimed = self.claim(config['JOB_WORKERS'] * 4)
+                    db.session.remove()
+                list(pool.map(self._run_in_context, claimed))
+                if not claimed:
+                    stop.wait(config['JOB_POLL_SECONDS'])
+
+    def requeue_dead(self):
+        """Queues every dead job again and returns how many."""
+        dead = DeadJob.query.all()
+        for job in dead:
+            Job.enqueue(job.task, **job.payload)
+            db.session.delete(job)
+        db.session.commit()
+        return len(dead)
+
+    def stats(self):
+        """Describes the queue depth and what the workers of this process
+        have done."""
+        now = datetime.utcnow()
+        by_status = dict(
+            db.session.query(Job.status, db.func.count())
+                      .group_by(Job.status)
+        )
+        oldest = (
+            db.session.query(db.func.min(Job.run_at))
+                      .filter(Job.status == 'queued', Job.run_at <= now)
+                      .scalar()
+        )
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'queued': by_status.get('queued', 0),
+            'running': by_status.get('running', 0),
+            'due': db.session.query(Job)
+                             .filter(Job.status == 'queued',
+                                     Job.run_at <= now)
+                             .count(),
+            'oldest_due_seconds': round(
+                (now - oldest).total_seconds() if oldest else 0, 3
+            ),
+            'dead': db.session.query(DeadJob).count(),
+            'by_task': dict(
+                db.session.query(Job.task, db.func.count())
+                          .group_by(Job.task)
+            ),
+            **counters,
+        }
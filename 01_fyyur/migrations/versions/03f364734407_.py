@@ -0,0 +1,43 @@
+"""add upcoming show counters to artist and venue
+
+Revision ID: 03f364734407
+Revises: 1329744ba273
+Create Date: 2026-10-18 12:03:18.624410
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '03f364734407'
+down_revision = '1329744ba273'
+branch_labels = None
+depends_on = None
+
+OWNERS = ['artist', 'venue']
+
+
+def upgrade():
+    for owner in OWNERS:
+        op.add_column(owner, sa.Column('upcoming_show_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(owner, sa.Column('next_show_time', sa.DateTime(), nullable=True))
+        op.create_index(f'ix_{owner}_upcoming_show_count', owner, ['upcoming_show_count'], unique=False)
+        # Show times are naive local times, so compare them against the
+        # local clock of the app rather than the database server's now().
+        op.execute(sa.text(
+            f'UPDATE {owner} SET '
+            f'upcoming_show_count = (SELECT count(*) FROM show '
+            f'WHERE show.{owner}_id = {owner}.id AND show.start_time >= :now), '
+            f'next_show_time = (SELECT min(show.start_time) FROM show '
+            f'WHERE show.{owner}_id = {owner}.id AND show.start_time >= :now)'
+        ).bindparams(now=datetime.now()))
+
+
+def downgrade():
+    for owner in OWNERS:
+        op.drop_index(f'ix_{owner}_upcoming_show_count', table_name=owner)
+        op.drop_column(owner, 'next_show_time')
+        op.drop_column(owner, 'upcoming_show_count')
@@ -0,0 +1,106 @@
+"""move genres into genre association tables
+
+Revision ID: 8e74352e3d99
+Revises: c806369d0ae1
+Create Date: 2026-10-18 10:41:07.502913
+
+"""
+import csv
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e74352e3d99'
+down_revision = 'c806369d0ae1'
+branch_labels = None
+depends_on = None
+
+OWNERS = ['artist', 'venue']
+
+
+def parse_genres(value):
+    """Splits a stored genres string, either a PostgreSQL array literal
+    such as '{Jazz,"Rock n Roll"}' or a plain comma separated list."""
+    if not value:
+        return []
+    value = value.strip()
+    if value.startswith('{') and value.endswith('}'):
+        value = value[1:-1]
+    return [
+        genre.strip()
+        for genre
+        in next(csv.reader([value], skipinitialspace=True), [])
+        if genre.strip()
+    ]
+
+
+def upgrade():
+    genre = op.create_table('genre',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    links = {}
+    for owner in OWNERS:
+        links[owner] = op.create_table(f'{owner}_genre',
+        sa.Column(f'{owner}_id', sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([f'{owner}_id'], [f'{owner}.id'], ondelete='cascade'),
+        sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ondelete='cascade'),
+        sa.PrimaryKeyConstraint(f'{owner}_id', 'genre_id')
+        )
+        op.create_index(f'ix_{owner}_genre_genre_id', f'{owner}_genre',
+                        ['genre_id', f'{owner}_id'], unique=False)
+
+    connection = op.get_bind()
+    owner_genres = {
+        owner: [
+            (row.id, parse_genres(row.genres))
+            for row
+            in connection.execute(sa.text(f'SELECT id, genres FROM {owner}'))
+        ]
+        for owner
+        in OWNERS
+    }
+    names = sorted(set(
+        name
+        for rows in owner_genres.values()
+        for _, genres in rows
+        for name in genres
+    ))
+    if names:
+        op.bulk_insert(genre, [{'name': name} for name in names])
+    genre_ids = dict(
+        (row.name, row.id)
+        for row
+        in connection.execute(sa.text('SELECT id, name FROM genre'))
+    )
+    for owner, rows in owner_genres.items():
+        records = [
+            {f'{owner}_id': owner_id, 'genre_id': genre_ids[name]}
+            for owner_id, genres in rows
+            for name in dict.fromkeys(genres)
+        ]
+        if records:
+            op.bulk_insert(links[owner], records)
+        op.drop_column(owner, 'genres')
+
+
+def downgrade():
+    for owner in OWNERS:
+        op.add_column(owner, sa.Column('genres', sa.String(length=120), nullable=True))
+        op.execute(
+            f"UPDATE {owner} SET genres = ("
+            f"SELECT '{{' || string_agg('\"' || genre.name || '\"', ',' ORDER BY genre.name) || '}}' "
+            f"FROM {owner}_genre JOIN genre ON genre.id = {owner}_genre.genre_id "
+            f"WHERE {owner}_genre.{owner}_id = {owner}.id)"
+        )
+        op.create_index(f'ix_{owner}_genres_trgm', owner, ['genres'],
+                        postgresql_using='gin',
+                        postgresql_ops={'genres': 'gin_trgm_ops'})
+        op.drop_index(f'ix_{owner}_genre_genre_id', table_name=f'{owner}_genre')
+        op.drop_table(f'{owner}_genre')
+    op.drop_table('genre')
@@ -0,0 +1,74 @@
+"""add show end times and booking exclusion constraints
+
+Existing shows are given the default three hour length. Overlapping shows
+of a venue or an artist have to be resolved before the exclusion
+constraints can be added; the upgrade lists them and stops if there are
+any.
+
+Revision ID: a7c3e91f4d26
+Revises: 5d1f0c7a9b3e
+Create Date: 2026-10-18 15:21:44.902311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e91f4d26'
+down_revision = '5d1f0c7a9b3e'
+branch_labels = None
+depends_on = None
+
+OWNERS = ['artist', 'venue']
+# Most overlapping pairs of shows listed when the upgrade stops.
+OVERLAPS_LISTED = 50
+
+
+def find_overlaps(owner):
+    """Pairs of shows of the same owner whose times overlap."""
+    return op.get_bind().execute(sa.text(
+        f'SELECT a.{owner}_id, a.id, a.start_time, b.id, b.start_time '
+        f'FROM show a JOIN show b ON a.{owner}_id = b.{owner}_id '
+        f'AND a.id < b.id '
+        f'AND tsrange(a.start_time, a.end_time) && tsrange(b.start_time, b.end_time) '
+        f'ORDER BY a.{owner}_id, a.start_time, b.start_time'
+    )).fetchall()
+
+
+def check_overlaps():
+    lines = [
+        f'{owner} {owner_id}: show {id} at {start_time} and show {other_id} at {other_start_time}'
+        for owner in OWNERS
+        for owner_id, id, start_time, other_id, other_start_time in find_overlaps(owner)
+    ]
+    if lines:
+        listed = '\n'.join(lines[:OVERLAPS_LISTED])
+        more = len(lines) - OVERLAPS_LISTED
+        raise RuntimeError(
+            f'{len(lines)} pairs of shows overlap and must be rescheduled or '
+            f'deleted before the booking constraints can be added:\n{listed}'
+            + (f'\n... and {more} more' if more > 0 else '')
+        )
+
+
+def upgrade():
+    op.add_column('show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    op.execute("UPDATE show SET end_time = start_time + interval '3 hours'")
+    op.alter_column('show', 'end_time', nullable=False)
+    op.create_check_constraint('ck_show_end_time_after_start_time', 'show', 'end_time > start_time')
+    check_overlaps()
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for owner in OWNERS:
+        op.execute(
+            f'ALTER TABLE "show" ADD CONSTRAINT ex_show_{owner}_id_time '
+            f'EXCLUDE USING gist ({owner}_id WITH =, '
+            f'tsrange(start_time, end_time) WITH &&)'
+        )
+
+
+def downgrade():
+    for owner in OWNERS:
+        op.drop_constraint(f'ex_show_{owner}_id_time', 'show')
+    op.drop_constraint('ck_show_end_time_after_start_time', 'show', type_='check')
+    op.drop_column('show', 'end_time')
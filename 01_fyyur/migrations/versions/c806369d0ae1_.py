@@ -0,0 +1,40 @@
+"""add trigram search indexes
+
+Revision ID: c806369d0ae1
+Revises: 521baddb6e4a
+Create Date: 2026-10-18 09:12:40.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c806369d0ae1'
+down_revision = '521baddb6e4a'
+branch_labels = None
+depends_on = None
+
+SEARCHABLE = {
+    'artist': ['name', 'city', 'genres'],
+    'venue': ['name', 'city', 'genres'],
+}
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, columns in SEARCHABLE.items():
+        for column in columns:
+            op.create_index(
+                f'ix_{table}_{column}_trgm',
+                table,
+                [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+            )
+
+
+def downgrade():
+    for table, columns in SEARCHABLE.items():
+        for column in columns:
+            op.drop_index(f'ix_{table}_{column}_trgm', table_name=table)
@@ -1,15 +1,35 @@
+from functools import cached_property
+
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from models.cursor import KeysetPage, decode_cursor
+
+from models.genre import GenreMixin
 from models.model import db, Model
+from models.search import SearchMixin, enable_search
+from models.show import Show, ShowCounterMixin
 
 
-class Artist(Model):
+class Artist(SearchMixin, GenreMixin, ShowCounterMixin, Model):
     __tablename__ = 'artist'
+    __searchable__ = ('name', 'city')
+    __show_key__ = 'artist_id'
+    __show_partner__ = 'venue'
+    __table_args__ = (
+        db.Index('ix_artist_name_id', 'name', 'id'),
+        db.Index(
+            'ix_artist_upcoming_show_count_name_id',
+            db.text('upcoming_show_count DESC'),
+            'name',
+            'id'
+        ),
+    )
 
     id = db.Column(db.Integer, autoincrement=True, primary_key=True)
-    name = db.Column(db.String)
+    name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
     website = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
@@ -20,7 +40,80 @@ class Artist(Model):
         backref='artist',
         cascade='all, delete',
         lazy=True,
+        passive_deletes=True,
+        order_by='Show.start_time',
     )
 
+    @classmethod
+    def fetch_with_shows(cls, artist_id):
+        """Loads an artist with its shows and their venues in one query,
+        plus one more for its genres."""
+        return (
+            cls.query
+               .options(
+                   joinedload(cls.shows).joinedload(Show.venue),
+                   selectinload(cls.genre_list),
+               )
+               .filter(cls.id == artist_id)
+               .first_or_404()
+        )
+
+    @classmethod
+    def fetch_page(cls, after=None, per_page=50, genre=None,
+                   most_active=False):
+        """Lists artists by name, paginated by the cursor of the last page.
+
+        With most_active, artists with more upcoming shows come first. Only
+        the columns rendered by the artist listing are loaded.
+
+        Raises: ValueError if the cursor is malformed.
+        """
+        query = cls.query_by_genre(genre) if genre else cls.query
+        query = query.options(
+            load_only(cls.id, cls.name, cls.upcoming_show_count)
+        )
+        if most_active:
+            query = query.order_by(cls.upcoming_show_count.desc(), cls.name,
+                                   cls.id)
+            key = lambda artist: (artist.upcoming_show_count, artist.name,
+                                  artist.id)
+        else:
+            query = query.order_by(cls.name, cls.id)
+            key = lambda artist: (artist.name, artist.id)
+
+        if after is not None:
+            if most_active:
+                count, name, artist_id = decode_cursor(after, int, str, int)
+                query = query.filter(db.or_(
+                    cls.upcoming_show_count < count,
+                    db.and_(
+                        cls.upcoming_show_count == count,
+                        db.tuple_(cls.name, cls.id) > (name, artist_id)
+                    )
+                ))
+            else:
+                name, artist_id = decode_cursor(after, str, int)
+                query = query.filter(db.tuple_(cls.name, cls.id) > (name, artist_id))
+        return KeysetPage(query.limit(per_page + 1), per_page, key)
+
+    @cached_property
+    def past_shows(self):
+        return [show for show in self.shows if not show.is_upcoming]
+
+    @cached_property
+    def upcoming_shows(self):
+        return [show for show in self.shows if show.is_upcoming]
+
+    @property
+    def past_shows_count(self):
+        return len(self.past_shows)
+
+    @property
+    def upcoming_shows_count(self):
+        return len(self.upcoming_shows)
+
     def __repr__(self):
         return f'<Artist {self.id} {self.name}>'
+
+
+enable_search(Artist)
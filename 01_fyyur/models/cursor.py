@@ -0,0 +1,52 @@
+"""Opaque cursors for keyset pagination."""
+import base64
+import json
+
+
+def encode_cursor(*values):
+    """Packs the sort key of the last row of a page into a URL-safe token."""
+    data = json.dumps(values, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """Unpacks a token made by encode_cursor, whose values must be of the
+    given types, in order.
+
+    Raises: ValueError if the token is malformed.
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+    if (not isinstance(values, list) or len(values) != len(types)
+            or not all(isinstance(value, kind) and not isinstance(value, bool)
+                       for value, kind in zip(values, types))):
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return values
+
+
+class KeysetPage():
+    """Lazily iterates one keyset page of rows.
+
+    rows should hold one row more than per_page; key returns the sort key
+    of a row. The next_cursor attribute is only known once iteration has
+    gone past the last row of the page, which lets streamed templates read
+    it at the end.
+    """
+
+    def __init__(self, rows, per_page, key):
+        self.rows = rows
+        self.per_page = per_page
+        self.key = key
+        self.next_cursor = None
+
+    def __iter__(self):
+        last = None
+        for count, row in enumerate(self.rows):
+            if count == self.per_page:
+                self.next_cursor = encode_cursor(*self.key(last))
+                break
+            last = row
+            yield row
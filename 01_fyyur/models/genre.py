@@ -0,0 +1,100 @@
+from sqlalchemy.ext.declarative import declared_attr
+
+from models.model import db, Model
+
+
+artist_genre = db.Table(
+    'artist_genre',
+    db.Column(
+        'artist_id',
+        db.Integer,
+        db.ForeignKey('artist.id', ondelete='cascade'),
+        primary_key=True
+    ),
+    db.Column(
+        'genre_id',
+        db.Integer,
+        db.ForeignKey('genre.id', ondelete='cascade'),
+        primary_key=True
+    ),
+    db.Index('ix_artist_genre_genre_id', 'genre_id', 'artist_id'),
+)
+
+venue_genre = db.Table(
+    'venue_genre',
+    db.Column(
+        'venue_id',
+        db.Integer,
+        db.ForeignKey('venue.id', ondelete='cascade'),
+        primary_key=True
+    ),
+    db.Column(
+        'genre_id',
+        db.Integer,
+        db.ForeignKey('genre.id', ondelete='cascade'),
+        primary_key=True
+    ),
+    db.Index('ix_venue_genre_genre_id', 'genre_id', 'venue_id'),
+)
+
+
+class Genre(Model):
+    """Database genre model, shared by artists and venues."""
+    __tablename__ = 'genre'
+
+    id = db.Column(db.Integer, autoincrement=True, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    @classmethod
+    def fetch_or_create(cls, names):
+        """Resolves genre names to rows with one query, adding any new
+        genres to the session."""
+        if isinstance(names, str):
+            names = [names]
+        names = list(dict.fromkeys(name for name in names if name))
+        if not names:
+            return []
+        genres = {
+            genre.name: genre
+            for genre
+            in cls.query.filter(cls.name.in_(names))
+        }
+        for name in names:
+            if name not in genres:
+                genres[name] = cls(name=name)
+                db.session.add(genres[name])
+        return [genres[name] for name in names]
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f'<Genre {self.id} {self.name}>'
+
+
+class GenreMixin():
+    """Gives a model a many-to-many genre_list, stored in the
+    <tablename>_genre association table, and a genres list of names."""
+
+    @declared_attr
+    def genre_list(cls):
+        return db.relationship(
+            'Genre',
+            secondary=f'{cls.__tablename__}_genre',
+            lazy=True,
+            order_by='Genre.name',
+            passive_deletes=True,
+        )
+
+    @property
+    def genres(self):
+        return [genre.name for genre in self.genre_list]
+
+    @genres.setter
+    def genres(self, names):
+        self.genre_list = Genre.fetch_or_create(names)
+
+    @classmethod
+    def query_by_genre(cls, genre):
+        """Filters rows by genre name through the association table index."""
+        return cls.query.join(cls.genre_list).filter(Genre.name == genre)
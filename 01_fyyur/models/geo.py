@@ -0,0 +1,221 @@
+"""Venue locations and nearest neighbour lookups.
+
+Rows are placed with an offline geocoding table, data/places.csv, which
+maps a city and state to the coordinates of its centre; explicitly given
+coordinates are kept. Every located row also stores an integer geohash,
+which interleaves the bits of its latitude and longitude so that the points
+of any cell of the quadtree they describe share one range of keys, and the
+geohash is indexed.
+
+nearest() searches a circle around the point, starting small. The bounding
+box of the circle is covered with at most MAX_RANGES cells, read as index
+range scans of the geohash; while fewer than k rows are found the circle
+grows, and once the k-th nearest row found lies inside it the search is
+complete. The k nearest are then loaded with one more query, so only the
+neighbourhood of the point is read however many rows there are. Distances
+are great-circle distances in kilometres.
+"""
+import csv
+import functools
+import math
+import os
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import load_only
+
+from models.model import db
+
+
+PLACES_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                           'data', 'places.csv')
+# Bits of latitude and of longitude in a geohash, about 600 m apart.
+GEOHASH_BITS = 15
+# Most key ranges read for one bounding box.
+MAX_RANGES = 16
+# Radius of the first search around a point.
+FIRST_RADIUS_KM = 2.0
+EARTH_RADIUS_KM = 6371.0
+
+
+@functools.lru_cache(maxsize=None)
+def _places():
+    with open(PLACES_FILE, newline='', encoding='utf-8') as file:
+        return {
+            (row['city'].casefold(), row['state'].upper()):
+                (float(row['latitude']), float(row['longitude']))
+            for row
+            in csv.DictReader(file)
+        }
+
+
+def geocode(city, state):
+    """Returns the (latitude, longitude) of a city, or None if it is not
+    in the geocoding table."""
+    if not city or not state:
+        return None
+    return _places().get((city.strip().casefold(), state.strip().upper()))
+
+
+def distance_km(latitude, longitude, other_latitude, other_longitude):
+    """Great-circle distance between two points, in kilometres."""
+    phi, other_phi = math.radians(latitude), math.radians(other_latitude)
+    a = (math.sin((other_phi - phi) / 2) ** 2
+         + math.cos(phi) * math.cos(other_phi)
+         * math.sin(math.radians(other_longitude - longitude) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _interleave(y, x):
+    key = 0
+    for bit in range(GEOHASH_BITS):
+        key |= ((x >> bit) & 1) << (2 * bit)
+        key |= ((y >> bit) & 1) << (2 * bit + 1)
+    return key
+
+
+def _quantize(latitude, longitude):
+    steps = 1 << GEOHASH_BITS
+    y = int((latitude + 90) / 180 * steps)
+    x = int((longitude + 180) / 360 * steps)
+    return min(max(y, 0), steps - 1), min(max(x, 0), steps - 1)
+
+
+def geohash(latitude, longitude):
+    """Returns the integer geohash of a point, interleaving the bits of its
+    latitude and longitude, or None if it has no coordinates."""
+    if latitude is None or longitude is None:
+        return None
+    return _interleave(*_quantize(latitude, longitude))
+
+
+def bounding_boxes(latitude, longitude, radius_km):
+    """Returns the (south, west, north, east) boxes holding every point
+    within radius_km of a point; two when they cross the antimeridian."""
+    angle = radius_km / EARTH_RADIUS_KM
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+    if south <= -90 or north >= 90 or angle >= math.pi / 2:
+        return [(max(south, -90), -180, min(north, 90), 180)]
+    spread = math.degrees(math.asin(
+        min(1.0, math.sin(angle) / math.cos(math.radians(latitude)))
+    ))
+    west, east = longitude - spread, longitude + spread
+    if spread >= 180:
+        return [(south, -180, north, 180)]
+    if west < -180:
+        return [(south, west + 360, north, 180), (south, -180, north, east)]
+    if east > 180:
+        return [(south, west, north, 180), (south, -180, north, east - 360)]
+    return [(south, west, north, east)]
+
+
+def geohash_ranges(box):
+    """Covers a (south, west, north, east) box with at most MAX_RANGES
+    ranges of geohashes, from the finest cells that allow it."""
+    south, west, north, east = box
+    (first_y, first_x), (last_y, last_x) = (_quantize(south, west),
+                                            _quantize(north, east))
+    level = GEOHASH_BITS
+    while ((((last_y >> (GEOHASH_BITS - level))
+             - (first_y >> (GEOHASH_BITS - level)) + 1)
+            * ((last_x >> (GEOHASH_BITS - level))
+               - (first_x >> (GEOHASH_BITS - level)) + 1)) > MAX_RANGES):
+        level -= 1
+    shift = GEOHASH_BITS - level
+    size = 1 << (2 * shift)
+    starts = sorted(
+        _interleave(y << shift, x << shift)
+        for y in range(first_y >> shift, (last_y >> shift) + 1)
+        for x in range(first_x >> shift, (last_x >> shift) + 1)
+    )
+    # Neighbouring cells often follow each other on the curve; merge them.
+    ranges = []
+    for start in starts:
+        if ranges and ranges[-1][1] == start - 1:
+            ranges[-1][1] = start + size - 1
+        else:
+            ranges.append([start, start + size - 1])
+    return ranges
+
+
+class GeoMixin():
+    """Gives a model latitude and longitude columns, filled in from its
+    city and state, and nearest neighbour lookups over them."""
+
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.Integer, index=True)
+
+    @classmethod
+    def _within(cls, latitude, longitude, radius_km):
+        return db.or_(*(
+            cls.geohash.between(first, last)
+            for box
+            in bounding_boxes(latitude, longitude, radius_km)
+            for first, last
+            in geohash_ranges(box)
+        ))
+
+    @classmethod
+    def nearest(cls, latitude, longitude, k=10):
+        """Fetches the k located rows nearest a point, nearest first, as
+        (row, distance in km) pairs."""
+        radius = FIRST_RADIUS_KM
+        while True:
+            ranked = sorted(
+                (distance_km(latitude, longitude, candidate.latitude,
+                             candidate.longitude), candidate.id)
+                for candidate
+                in db.session.query(cls.id, cls.latitude, cls.longitude)
+                            .filter(cls._within(latitude, longitude, radius))
+            )
+            if len(ranked) >= k and ranked[k - 1][0] <= radius:
+                break
+            if radius >= math.pi * EARTH_RADIUS_KM:
+                break
+            if len(ranked) >= k:
+                # The cells read reach past the radius; the k-th nearest
+                # found so far bounds the search.
+                radius = ranked[k - 1][0]
+            else:
+                radius *= 2
+
+        ranked = ranked[:k]
+        matches = {
+            match.id: match
+            for match
+            in cls.query
+                  .options(load_only(cls.id, cls.name, cls.city, cls.state,
+                                     cls.latitude, cls.longitude))
+                  .filter(cls.id.in_([id for _, id in ranked]))
+        }
+        return [(matches[id], distance) for distance, id in ranked]
+
+    @classmethod
+    def geocode_missing(cls):
+        """Locates rows without coordinates, returning how many were
+        found in the geocoding table."""
+        located = 0
+        for row in cls.query.filter(cls.latitude.is_(None)):
+            coordinates = geocode(row.city, row.state)
+            if coordinates:
+                row.latitude, row.longitude = coordinates
+                located += 1
+        db.session.commit()
+        return located
+
+
+@event.listens_for(GeoMixin, 'before_insert', propagate=True)
+@event.listens_for(GeoMixin, 'before_update', propagate=True)
+def _locate(mapper, connection, target):
+    state = inspect(target)
+    moved = any(state.attrs[key].history.has_changes()
+                for key in ('city', 'state'))
+    placed = any(state.attrs[key].history.has_changes()
+                 for key in ('latitude', 'longitude'))
+    unlocated = target.latitude is None and target.longitude is None
+    if (moved or unlocated) and not placed:
+        target.latitude, target.longitude = (
+            geocode(target.city, target.state) or (None, None)
+        )
+    target.geohash = geohash(target.latitude, target.longitude)
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from models.model import db, Model
+
+
+class Job(Model):
+    """A background job waiting to run; see jobs.py."""
+    __tablename__ = 'job'
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, autoincrement=True, primary_key=True)
+    task = db.Column(db.String(120), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow)
+
+    @classmethod
+    def enqueue(cls, task, **payload):
+        """Adds a job to the session, to be committed with the work that
+        needs it."""
+        job = cls(task=task, payload=payload)
+        db.session.add(job)
+        return job
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.task} {self.status}>'
+
+
+class DeadJob(Model):
+    """A background job that failed on every attempt."""
+    __tablename__ = 'dead_job'
+
+    id = db.Column(db.Integer, autoincrement=True, primary_key=True)
+    task = db.Column(db.String(120), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    attempts = db.Column(db.Integer, nullable=False)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+    failed_at = db.Column(db.DateTime, nullable=False,
+                          default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DeadJob {self.id} {self.task}>'
@@ -1,8 +1,24 @@
+import sqlite3
+from contextlib import contextmanager
 from typing import Any, Dict, List
 
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import as_declarative
 
+from db_pool import SQLAlchemy
+from page_cache import invalidate
+
+
+class UnitOfWork():
+    """The writes deferred by an open Model.unit_of_work block."""
+
+    def __init__(self):
+        self.inserted = {}
+        self.updated = {}
+        self.deleted = []
+        self.tags = set()
+
 
 @as_declarative()
 class Model():
@@ -10,21 +26,161 @@ class Model():
 
     __abstract__: bool = True
 
+    @staticmethod
+    def _unit_of_work():
+        return db.session.info.get('unit_of_work')
+
+    @classmethod
+    @contextmanager
+    def unit_of_work(cls):
+        """Defers the commits of insert, update and delete to the end of
+        the block and writes everything in one transaction.
+
+        On exit inserts are written model by model through insert_all, the
+        session is flushed once, the after_* hooks run and the transaction
+        commits. An exception rolls all of it back. Blocks opened inside
+        another one join it.
+        """
+        if cls._unit_of_work() is not None:
+            yield
+            return
+        unit = db.session.info['unit_of_work'] = UnitOfWork()
+        try:
+            yield
+            for model, objects in unit.inserted.items():
+                model.insert_all(objects)
+            db.session.flush()
+            for model, objects in unit.inserted.items():
+                model.after_insert_all(objects)
+                for object in objects:
+                    unit.tags.update(object.cache_tags())
+            for object in unit.updated.values():
+                object.after_update()
+                unit.tags.update(object.cache_tags())
+            for object in unit.deleted:
+                object.after_delete()
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+        finally:
+            del db.session.info['unit_of_work']
+        invalidate(*unit.tags)
+
+    @classmethod
+    def insert_all(cls, objects):
+        """Writes the rows inserted in a unit of work; flushed by it."""
+        db.session.add_all(objects)
+
+    @classmethod
+    def after_insert_all(cls, objects):
+        """Runs the after_insert hook of rows inserted in a unit of work."""
+        for object in objects:
+            object.after_insert()
+
     def insert(self):
         """Inserts a row into the database."""
+        unit = self._unit_of_work()
+        if unit is not None:
+            unit.inserted.setdefault(type(self), []).append(self)
+            return
         db.session.add(self)
+        db.session.flush()
+        self.after_insert()
+        tags = self.cache_tags()
         db.session.commit()
+        invalidate(*tags)
 
     def update(self, **attributes):
         """Updates a row in the database."""
+        tags = set(self.cache_tags())
         for key, value in attributes.items():
             setattr(self, key, value)
+        unit = self._unit_of_work()
+        if unit is not None:
+            unit.tags.update(tags)
+            unit.updated[id(self)] = self
+            return
+        db.session.flush()
+        self.after_update()
+        tags.update(self.cache_tags())
         db.session.commit()
+        invalidate(*tags)
 
     def delete(self):
         """Deletes a row from the database."""
+        unit = self._unit_of_work()
+        if unit is not None:
+            pending = unit.inserted.get(type(self), [])
+            if self in pending:
+                pending.remove(self)
+                return
+            unit.tags.update(self.cache_tags())
+            db.session.delete(self)
+            unit.deleted.append(self)
+            return
+        tags = self.cache_tags()
         db.session.delete(self)
+        db.session.flush()
+        self.after_delete()
+        db.session.commit()
+        invalidate(*tags)
+
+    @classmethod
+    def delete_all(cls, ids, tags=()):
+        """Deletes the rows with the given ids in one statement and returns
+        how many were deleted.
+
+        Nothing is loaded and the after_delete hook does not run; rows
+        referencing these are removed by the ON DELETE rules of the
+        database. tags names further cached pages to invalidate.
+        """
+        ids = sorted(set(ids))
+        if not ids:
+            return 0
+        tags = set(tags)
+        tags.add(cls.__tablename__)
+        tags.update(f'{cls.__tablename__}:{id}' for id in ids)
+        deleted = db.session.execute(
+            cls.__table__.delete().where(cls.__table__.c.id.in_(ids))
+        ).rowcount
+        unit = cls._unit_of_work()
+        if unit is not None:
+            unit.tags.update(tags)
+            return deleted
         db.session.commit()
+        invalidate(*tags)
+        return deleted
+
+    def after_insert(self):
+        """Runs in the inserting transaction once the row is flushed."""
+
+    def after_update(self):
+        """Runs in the updating transaction once the row is flushed."""
+
+    def after_delete(self):
+        """Runs in the deleting transaction once the row is flushed."""
+
+    @classmethod
+    def defer(cls, task, **payload):
+        """Queues a background job in the current transaction, so that it
+        runs only once the transaction commits; see jobs.py."""
+        from models.job import Job
+
+        return Job.enqueue(task, **payload)
+
+    def cache_tags(self):
+        """Names the cached pages showing this row; see page_cache.py."""
+        return [self.__tablename__, f'{self.__tablename__}:{self.id}']
 
 
 db = SQLAlchemy(model_class=Model)
+
+
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys, and so ON DELETE CASCADE, unless asked.
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
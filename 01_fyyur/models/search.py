@@ -0,0 +1,171 @@
+"""Ranked, index-backed search for artists and venues.
+
+PostgreSQL searches are served by pg_trgm GIN indexes, which back both the
+ILIKE substring filter and the similarity ranking. SQLite searches use an
+external-content FTS5 table with the trigram tokenizer, kept in sync with
+its source table by triggers. Terms shorter than a trigram, and any other
+database, fall back to an unindexed ILIKE. Genres live in their own small
+table and are matched separately through the association table index.
+"""
+from flask import current_app
+from sqlalchemy import DDL, event
+
+from models.genre import Genre
+from models.model import db
+
+
+def _escape_like(term):
+    return (term.replace('\\', '\\\\')
+                .replace('%', '\\%')
+                .replace('_', '\\_'))
+
+
+class SearchMixin():
+    """Adds ranked search over the __searchable__ columns of a model."""
+
+    __searchable__ = ()
+
+    @classmethod
+    def search(cls, term, limit=None):
+        """Fetches up to limit rows matching term, best matches first.
+
+        limit defaults to the SEARCH_LIMIT setting.
+        """
+        if limit is None:
+            limit = current_app.config['SEARCH_LIMIT']
+        term = (term or '').strip()
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            matches = cls._search_trigram(term, limit)
+        elif dialect == 'sqlite' and len(term) >= 3:
+            matches = cls._search_fts(term, limit)
+        else:
+            matches = cls._search_like(term, limit)
+
+        if len(matches) < limit:
+            seen = set(match.id for match in matches)
+            matches += [
+                match
+                for match
+                in cls._search_genres(term, limit)
+                if match.id not in seen
+            ]
+        return matches[:limit]
+
+    @classmethod
+    def _like_filter(cls, term):
+        pattern = f'%{_escape_like(term)}%'
+        return db.or_(*(
+            getattr(cls, column).ilike(pattern, escape='\\')
+            for column
+            in cls.__searchable__
+        ))
+
+    @classmethod
+    def _search_like(cls, term, limit):
+        return (
+            cls.query
+               .filter(cls._like_filter(term))
+               .order_by(cls.name, cls.id)
+               .limit(limit)
+               .all()
+        )
+
+    @classmethod
+    def _search_genres(cls, term, limit):
+        if not hasattr(cls, 'genre_list'):
+            return []
+        pattern = f'%{_escape_like(term)}%'
+        return (
+            cls.query
+               .join(cls.genre_list)
+               .filter(Genre.name.ilike(pattern, escape='\\'))
+               .distinct()
+               .order_by(cls.name, cls.id)
+               .limit(limit)
+               .all()
+        )
+
+    @classmethod
+    def _search_trigram(cls, term, limit):
+        rank = db.func.greatest(*(
+            db.func.similarity(getattr(cls, column), term)
+            for column
+            in cls.__searchable__
+        ))
+        return (
+            cls.query
+               .filter(cls._like_filter(term))
+               .order_by(rank.desc(), cls.name, cls.id)
+               .limit(limit)
+               .all()
+        )
+
+    @classmethod
+    def _search_fts(cls, term, limit):
+        fts = db.table(
+            f'{cls.__tablename__}_fts',
+            db.column('rowid'),
+            db.column('rank'),
+        )
+        phrase = '"{}"'.format(term.replace('"', '""'))
+        return (
+            cls.query
+               .join(fts, fts.c.rowid == cls.id)
+               .filter(db.literal_column(fts.name).op('MATCH')(phrase))
+               .order_by(fts.c.rank, cls.id)
+               .limit(limit)
+               .all()
+        )
+
+
+def _sqlite_ddl(table, columns):
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    delete = (f"INSERT INTO {fts}({fts}, rowid, {names}) "
+              f"VALUES ('delete', old.id, {old});")
+    insert = f'INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});'
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', "
+        f"content_rowid='id', tokenize='trigram')",
+        f'CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} '
+        f'BEGIN {insert} END',
+        f'CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} '
+        f'BEGIN {delete} END',
+        f'CREATE TRIGGER {fts}_update AFTER UPDATE ON {table} '
+        f'BEGIN {delete} {insert} END',
+    ]
+
+
+def _postgresql_ddl(table, columns):
+    return ['CREATE EXTENSION IF NOT EXISTS pg_trgm'] + [
+        f'CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm '
+        f'ON {table} USING gin ({column} gin_trgm_ops)'
+        for column
+        in columns
+    ]
+
+
+def enable_search(model):
+    """Creates the search index of model alongside its table."""
+    table = model.__table__
+    columns = model.__searchable__
+    for statement in _sqlite_ddl(table.name, columns):
+        event.listen(
+            table,
+            'after_create',
+            DDL(statement).execute_if(dialect='sqlite')
+        )
+    for statement in _postgresql_ddl(table.name, columns):
+        event.listen(
+            table,
+            'after_create',
+            DDL(statement).execute_if(dialect='postgresql')
+        )
+    event.listen(
+        table,
+        'before_drop',
+        DDL(f'DROP TABLE IF EXISTS {table.name}_fts').execute_if(dialect='sqlite')
+    )
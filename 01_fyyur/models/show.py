@@ -1,11 +1,175 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import DDL, event, inspect
+
+from models.cursor import KeysetPage, decode_cursor
 from models.model import db, Model
 
 
+# Shows booked without an end time take SHOW_LENGTH. None may run longer
+# than MAX_SHOW_LENGTH, which bounds overlap lookups on the start time
+# indexes.
+SHOW_LENGTH = timedelta(hours=3)
+MAX_SHOW_LENGTH = timedelta(hours=12)
+
+
+def local_now():
+    """The current time as a statement parameter, read on every execution.
+
+    Show times are naive local times, while the database clock runs in UTC
+    on SQLite and in the session time zone on PostgreSQL.
+    """
+    return db.bindparam('now', callable_=datetime.now, type_=db.DateTime,
+                        unique=True)
+
+
+def _default_end_time(context):
+    return context.get_current_parameters()['start_time'] + SHOW_LENGTH
+
+
+class ShowCounterMixin():
+    """Keeps a count of upcoming shows and the time of the next one on the
+    row itself, so listings can sort by activity without reading shows.
+
+    The counters change with Show.insert, Show.update and Model.delete, and
+    go stale only as time passes; refresh_show_counters(stale_only=True)
+    rolls shows that have started from upcoming to past.
+
+    Shows are deleted with their artist or venue by the database, through
+    ON DELETE CASCADE, so deletes never load them. The rows on the other
+    side of those shows are read from the show table beforehand and
+    recounted by a background job.
+    """
+
+    __show_key__ = None
+    # The table on the other side of the shows, e.g. 'venue' for artists.
+    __show_partner__ = None
+
+    upcoming_show_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+        index=True
+    )
+    next_show_time = db.Column(db.DateTime)
+
+    @classmethod
+    def count_upcoming_show(cls, owner_id, start_time):
+        """Adds one show starting at start_time, if it is upcoming."""
+        start_time = db.literal(start_time, db.DateTime)
+        db.session.execute(
+            db.update(cls.__table__)
+              .where(cls.__table__.c.id == owner_id)
+              .where(start_time >= local_now())
+              .values(
+                  upcoming_show_count=cls.__table__.c.upcoming_show_count + 1,
+                  next_show_time=db.case(
+                      (cls.__table__.c.next_show_time.is_(None), start_time),
+                      (cls.__table__.c.next_show_time > start_time, start_time),
+                      else_=cls.__table__.c.next_show_time
+                  )
+              )
+        )
+
+    @classmethod
+    def refresh_show_counters(cls, owner_ids=None, stale_only=False):
+        """Recounts upcoming shows from the show table.
+
+        Only owner_ids are refreshed when given; with stale_only only rows
+        whose next show has already started are.
+        """
+        table = cls.__table__
+        show = Show.__table__
+        owner_key = show.c[cls.__show_key__]
+        upcoming = db.and_(owner_key == table.c.id,
+                           show.c.start_time >= local_now())
+        statement = db.update(table).values(
+            upcoming_show_count=(
+                db.select([db.func.count()])
+                  .where(upcoming)
+                  .scalar_subquery()
+            ),
+            next_show_time=(
+                db.select([db.func.min(show.c.start_time)])
+                  .where(upcoming)
+                  .scalar_subquery()
+            ),
+        )
+        if owner_ids is not None:
+            owner_ids = set(owner_ids)
+            if not owner_ids:
+                return
+            statement = statement.where(table.c.id.in_(owner_ids))
+        if stale_only:
+            statement = statement.where(table.c.next_show_time < local_now())
+        db.session.execute(statement)
+
+    @classmethod
+    def show_partner_ids_of(cls, owner_ids):
+        """Ids of the rows sharing a show with any of owner_ids."""
+        show = Show.__table__
+        partner_key = show.c[f'{cls.__show_partner__}_id']
+        return sorted(
+            id
+            for (id,)
+            in db.session.query(partner_key)
+                         .filter(show.c[cls.__show_key__].in_(owner_ids))
+                         .distinct()
+        )
+
+    @classmethod
+    def delete_all(cls, ids, tags=()):
+        """Deletes rows and their shows in bulk, recounting the rows on
+        the other side of the shows in the background."""
+        partner = cls.__show_partner__
+        partner_ids = cls.show_partner_ids_of(set(ids))
+        if partner_ids:
+            cls.defer('refresh_show_counters', table=partner, ids=partner_ids)
+        return super().delete_all(
+            ids,
+            tags=[*tags, partner, *(f'{partner}:{id}' for id in partner_ids)]
+        )
+
+    def delete(self):
+        # The shows go with this row, so their other side is read first,
+        # once for both the recount and cache_tags.
+        partner_ids = self.show_partner_ids_of([self.id])
+        if partner_ids:
+            self.defer('refresh_show_counters', table=self.__show_partner__,
+                       ids=partner_ids)
+        self.__dict__['_show_partner_ids'] = partner_ids
+        super().delete()
+
+    def cache_tags(self):
+        # The pages of the rows sharing a show with this one show it too.
+        partner_ids = self.__dict__.pop('_show_partner_ids', None)
+        if partner_ids is None:
+            partner_ids = self.show_partner_ids_of([self.id])
+        return super().cache_tags() + [
+            f'{self.__show_partner__}:{id}'
+            for id
+            in partner_ids
+        ]
+
+
+class BookingConflict(ValueError):
+    """Raised when a show overlaps another show of its artist or venue."""
+
+
 class Show(Model):
     __tablename__ = 'show'
+    __table_args__ = (
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_show_start_time_id', 'start_time', 'id'),
+        db.CheckConstraint('end_time > start_time',
+                           name='ck_show_end_time_after_start_time'),
+    )
 
     id = db.Column(db.Integer, autoincrement=True, primary_key=True)
-    start_time = db.Column(db.DateTime)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False, default=_default_end_time)
     venue_id = db.Column(
         db.Integer,
         db.ForeignKey('venue.id', ondelete='cascade'),
@@ -16,6 +180,218 @@ class Show(Model):
         db.ForeignKey('artist.id', ondelete='cascade'),
         nullable=False
     )
+    # Evaluated in the query so past/upcoming splits need no Python clock.
+    is_upcoming = db.column_property(start_time >= local_now())
+
+    @classmethod
+    def overlapping(cls, start_time, end_time):
+        """Filters shows running at some point in [start_time, end_time).
+
+        Shows starting over MAX_SHOW_LENGTH earlier cannot overlap, which
+        keeps the lookup a bounded range scan of a start time index.
+        """
+        return db.and_(
+            cls.start_time < end_time,
+            cls.start_time > start_time - MAX_SHOW_LENGTH,
+            cls.end_time > start_time,
+        )
+
+    @classmethod
+    def book(cls, artist_id, venue_id, start_time, end_time=None):
+        """Lists a show unless its artist or venue is already booked.
+
+        PostgreSQL also enforces this with exclusion constraints, which
+        catch concurrent bookings the check here can miss.
+
+        Raises: ValueError if the times are invalid, BookingConflict if the
+        show conflicts with another.
+        """
+        end_time = end_time or start_time + SHOW_LENGTH
+        if not start_time < end_time <= start_time + MAX_SHOW_LENGTH:
+            raise ValueError(
+                f'A show must end after it starts and last at most '
+                f'{MAX_SHOW_LENGTH.total_seconds() / 3600:g} hours.'
+            )
+        conflict = (
+            cls.query
+               .filter(db.or_(cls.artist_id == artist_id,
+                              cls.venue_id == venue_id))
+               .filter(cls.overlapping(start_time, end_time))
+               .order_by(cls.start_time)
+               .first()
+        )
+        if conflict is not None:
+            booked = 'artist' if conflict.artist_id == artist_id else 'venue'
+            raise BookingConflict(
+                f'The {booked} is already booked from '
+                f'{conflict.start_time:%Y-%m-%d %H:%M} to '
+                f'{conflict.end_time:%Y-%m-%d %H:%M}.'
+            )
+        show = cls(artist_id=artist_id, venue_id=venue_id,
+                   start_time=start_time, end_time=end_time)
+        show.insert()
+        return show
+
+    @classmethod
+    def free_slots(cls, venue_id, start_time, end_time,
+                   min_length=timedelta(0)):
+        """Lists the (start, end) gaps of at least min_length between the
+        shows of a venue in [start_time, end_time), using one query."""
+        shows = (
+            db.session.query(cls.start_time, cls.end_time)
+              .filter(cls.venue_id == venue_id)
+              .filter(cls.overlapping(start_time, end_time))
+              .order_by(cls.start_time)
+        )
+        slots = []
+        free_from = start_time
+        for show_start, show_end in shows:
+            if show_start > free_from and show_start - free_from >= min_length:
+                slots.append((free_from, show_start))
+            free_from = max(free_from, show_end)
+        if end_time > free_from and end_time - free_from >= min_length:
+            slots.append((free_from, end_time))
+        return slots
+
+    @classmethod
+    def fetch_page(cls, after=None, per_page=20):
+        """Lists shows with their artist and venue names in one query,
+        ordered by start time and paginated by the cursor of the last page.
+
+        Only the columns rendered by the show listing are selected.
+
+        Raises: ValueError if the cursor is malformed.
+        """
+        from models.artist import Artist
+        from models.venue import Venue
+
+        query = (
+            db.session.query(
+                cls.id,
+                cls.start_time,
+                cls.artist_id,
+                cls.venue_id,
+                Artist.name.label('artist_name'),
+                Artist.image_link.label('artist_image_link'),
+                Venue.name.label('venue_name'),
+            )
+            .join(Artist, cls.artist_id == Artist.id)
+            .join(Venue, cls.venue_id == Venue.id)
+            .order_by(cls.start_time, cls.id)
+        )
+        if after is not None:
+            try:
+                start_time, show_id = decode_cursor(after, str, int)
+                start_time = datetime.fromisoformat(start_time)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f'Invalid cursor: {after}') from e
+            query = query.filter(
+                db.tuple_(cls.start_time, cls.id) > (start_time, show_id)
+            )
+        return KeysetPage(
+            query.limit(per_page + 1),
+            per_page,
+            lambda show: (show.start_time, show.id)
+        )
+
+    @classmethod
+    def insert_all(cls, shows):
+        # Shows only hold foreign keys, so unless one still waits on its
+        # artist or venue they are inserted with a single executemany,
+        # without loading their ids back.
+        if any(show.artist_id is None or show.venue_id is None
+               for show in shows):
+            return super().insert_all(shows)
+        db.session.flush()
+        db.session.bulk_save_objects(shows)
+
+    @classmethod
+    def after_insert_all(cls, shows):
+        from models.artist import Artist
+        from models.venue import Venue
+
+        Artist.refresh_show_counters(set(show.artist_id for show in shows))
+        Venue.refresh_show_counters(set(show.venue_id for show in shows))
+
+    def after_insert(self):
+        from models.artist import Artist
+        from models.venue import Venue
+
+        Artist.count_upcoming_show(self.artist_id, self.start_time)
+        Venue.count_upcoming_show(self.venue_id, self.start_time)
+
+    def after_update(self):
+        self._refresh_counters()
+
+    def after_delete(self):
+        self._refresh_counters()
+
+    def cache_tags(self):
+        # Listings sort by the show counters of artists and venues.
+        return [
+            'show',
+            'artist',
+            'venue',
+            f'artist:{self.artist_id}',
+            f'venue:{self.venue_id}',
+        ]
+
+    def _refresh_counters(self):
+        from models.artist import Artist
+        from models.venue import Venue
+
+        # A show moved to another artist or venue leaves the old one with a
+        # show less; see _remember_previous_owners.
+        moved_from = self.__dict__.pop('_moved_from', {})
+        Artist.refresh_show_counters(
+            sorted({self.artist_id, *moved_from.get('artist_id', ())})
+        )
+        Venue.refresh_show_counters(
+            sorted({self.venue_id, *moved_from.get('venue_id', ())})
+        )
+
+    @property
+    def artist_name(self):
+        return self.artist.name
+
+    @property
+    def artist_image_link(self):
+        return self.artist.image_link
+
+    @property
+    def venue_name(self):
+        return self.venue.name
+
+    @property
+    def venue_image_link(self):
+        return self.venue.image_link
 
     def __repr__(self):
         return f'<Show {self.id} {self.start_time}>'
+
+
+# No two shows of a venue, or of an artist, may overlap in time.
+for statement in (
+        'CREATE EXTENSION IF NOT EXISTS btree_gist',
+        'ALTER TABLE "show" ADD CONSTRAINT ex_show_venue_id_time '
+        'EXCLUDE USING gist (venue_id WITH =, '
+        'tsrange(start_time, end_time) WITH &&)',
+        'ALTER TABLE "show" ADD CONSTRAINT ex_show_artist_id_time '
+        'EXCLUDE USING gist (artist_id WITH =, '
+        'tsrange(start_time, end_time) WITH &&)'):
+    event.listen(
+        Show.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='postgresql')
+    )
+
+
+@event.listens_for(Show, 'before_update')
+def _remember_previous_owners(mapper, connection, show):
+    # The flush resets attribute history, and after_update runs after it.
+    state = inspect(show)
+    moved_from = show.__dict__.setdefault('_moved_from', {})
+    for key in ('artist_id', 'venue_id'):
+        previous = [id for id in state.attrs[key].history.deleted
+                    if id is not None]
+        moved_from.setdefault(key, set()).update(previous)
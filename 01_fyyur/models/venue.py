@@ -1,9 +1,25 @@
+from functools import cached_property
+from itertools import groupby
+from operator import attrgetter
+
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from models.geo import GeoMixin
+from models.genre import GenreMixin
 from models.model import db, Model
+from models.search import SearchMixin, enable_search
+from models.show import Show, ShowCounterMixin
 
 
-class Venue(Model):
+class Venue(SearchMixin, GenreMixin, GeoMixin, ShowCounterMixin, Model):
     """Database venue model."""
     __tablename__ = 'venue'
+    __searchable__ = ('name', 'city')
+    __show_key__ = 'venue_id'
+    __show_partner__ = 'artist'
+    __table_args__ = (
+        db.Index('ix_venue_state_city_name', 'state', 'city', 'name'),
+    )
 
     id = db.Column(db.Integer, autoincrement=True, primary_key=True)
     name = db.Column(db.String)
@@ -11,7 +27,6 @@ class Venue(Model):
     state = db.Column(db.String(120))
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
     website = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
@@ -22,8 +37,85 @@ class Venue(Model):
         backref='venue',
         cascade='all, delete',
         lazy=True,
+        passive_deletes=True,
+        order_by='Show.start_time',
     )
 
+    @classmethod
+    def fetch_with_shows(cls, venue_id):
+        """Loads a venue with its shows and their artists in one query,
+        plus one more for its genres."""
+        return (
+            cls.query
+               .options(
+                   joinedload(cls.shows).joinedload(Show.artist),
+                   selectinload(cls.genre_list),
+               )
+               .filter(cls.id == venue_id)
+               .first_or_404()
+        )
+
+    @classmethod
+    def fetch_areas(cls, page=None, per_page=10, genre=None,
+                    most_active=False):
+        """Lists venues grouped by city and state using a single query.
+
+        When page is given only that page of areas is returned, still in a
+        single query, by joining against the page of distinct locations.
+        When genre is given only venues of that genre are listed. With
+        most_active, venues in each area are ordered by upcoming shows.
+
+        Raises: ValueError if page is less than 1.
+        """
+        if page is not None and page < 1:
+            raise ValueError(f'Invalid page: {page}')
+        venues = cls.query_by_genre(genre) if genre else cls.query
+        if most_active:
+            order = (cls.upcoming_show_count.desc(), cls.next_show_time)
+        else:
+            order = ()
+        query = (
+            venues
+               .options(load_only(cls.id, cls.name, cls.city, cls.state))
+               .order_by(cls.state, cls.city, *order, cls.name, cls.id)
+        )
+        if page is not None:
+            areas = (
+                venues.with_entities(cls.city, cls.state)
+                      .distinct()
+                      .order_by(cls.state, cls.city)
+                      .limit(per_page)
+                      .offset((page - 1) * per_page)
+                      .subquery()
+            )
+            query = query.join(
+                areas,
+                db.and_(cls.city == areas.c.city, cls.state == areas.c.state)
+            )
+        return [
+            {'city': city, 'state': state, 'venues': list(venues)}
+            for (state, city), venues
+            in groupby(query, key=attrgetter('state', 'city'))
+        ]
+
+    @cached_property
+    def past_shows(self):
+        return [show for show in self.shows if not show.is_upcoming]
+
+    @cached_property
+    def upcoming_shows(self):
+        return [show for show in self.shows if show.is_upcoming]
+
+    @property
+    def past_shows_count(self):
+        return len(self.past_shows)
+
+    @property
+    def upcoming_shows_count(self):
+        return len(self.upcoming_shows)
+
     def __repr__(self):
         return f'<Venue {self.id} {self.name}>'
 
+
+enable_search(Venue)
@@ -0,0 +1,222 @@
+"""Rendered page cache for the Fyyur app.
+
+Views decorated with cached_page keep their rendered HTML for PAGE_CACHE_TTL
+seconds. Every page is tagged with the entities it shows, e.g. 'venue' for
+the venue listing and 'venue:3' for the page of venue 3, and Model.insert,
+update and delete invalidate the tags of the row they write once their
+transaction commits. Writes made directly through the session are not seen,
+so pages they affect stay cached until they expire.
+
+Invalidation bumps a version number per tag, and the versions of a page's
+tags are part of its cache key, so stale pages are never read again and
+simply age out. Pages are kept in process by default, with least recently
+used ones evicted past PAGE_CACHE_MAX_ENTRIES. That is only right for a
+single process: other server workers, and `flask run-jobs`, never see its
+invalidations, so the cache is off by default unless PAGE_CACHE_REDIS_URL
+is set. Setting it shares pages between processes through Redis instead;
+the server should evict with volatile-lru so that tag versions, which
+never expire, are kept.
+"""
+import functools
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from flask import current_app, has_app_context, request, session
+
+
+class MemoryBackend():
+    """Keeps pages in this process, evicting the least recently used."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def versions(self, tags):
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def stats(self):
+        return {'entries': len(self._entries), 'evictions': self.evictions}
+
+
+class RedisBackend():
+    """Shares pages between processes through Redis.
+
+    Needs the redis package, which is only imported when this backend is
+    used.
+    """
+
+    def __init__(self, url, prefix='fyyur:page:'):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        value = self._redis.get(self._prefix + key)
+        return None if value is None else value.decode('utf-8')
+
+    def set(self, key, value, ttl):
+        self._redis.set(self._prefix + key, value.encode('utf-8'), ex=ttl)
+
+    def versions(self, tags):
+        if not tags:
+            return []
+        keys = [f'{self._prefix}tag:{tag}' for tag in tags]
+        return [int(version or 0) for version in self._redis.mget(keys)]
+
+    def bump(self, tags):
+        pipeline = self._redis.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.incr(f'{self._prefix}tag:{tag}')
+        pipeline.execute()
+
+    def clear(self):
+        keys = list(self._redis.scan_iter(f'{self._prefix}*'))
+        if keys:
+            self._redis.delete(*keys)
+
+    def stats(self):
+        return {}
+
+
+class PageCache():
+    """Flask extension caching rendered pages under invalidation tags."""
+
+    def __init__(self, app=None, backend=None):
+        self.backend = backend
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE', False)
+        app.config.setdefault('PAGE_CACHE_TTL', 60)
+        app.config.setdefault('PAGE_CACHE_MAX_ENTRIES', 1000)
+        app.config.setdefault('PAGE_CACHE_REDIS_URL', None)
+        if self.backend is None:
+            url = app.config['PAGE_CACHE_REDIS_URL']
+            if url:
+                self.backend = RedisBackend(url)
+            else:
+                self.backend = MemoryBackend(
+                    app.config['PAGE_CACHE_MAX_ENTRIES']
+                )
+        app.extensions['page_cache'] = self
+
+    def _count(self, event, n=1):
+        with self._lock:
+            self._counts[event] += n
+
+    def fetch(self, path, tags, render):
+        """Returns the cached page for path, or renders and caches it.
+
+        The second value returned is whether the page came from the cache.
+        """
+        versions = self.backend.versions(tags)
+        key = path + '#' + ','.join(
+            f'{tag}={version}' for tag, version in zip(tags, versions)
+        )
+        page = self.backend.get(key)
+        if page is not None:
+            self._count('hits')
+            return page, True
+        self._count('misses')
+        page = render()
+        if isinstance(page, str):
+            self.backend.set(key, page, current_app.config['PAGE_CACHE_TTL'])
+        return page, False
+
+    def invalidate(self, *tags):
+        """Drops every cached page tagged with one of tags."""
+        if tags:
+            self.backend.bump(set(tags))
+            self._count('invalidations', len(set(tags)))
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self._counts.clear()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        hits = counts.get('hits', 0)
+        misses = counts.get('misses', 0)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'bypasses': counts.get('bypasses', 0),
+            'invalidations': counts.get('invalidations', 0),
+            'hit_ratio': round(hits / (hits + misses), 4) if hits else 0.0,
+            **self.backend.stats(),
+        }
+
+
+def cached_page(*tags):
+    """Caches the page a view renders until one of tags is invalidated.
+
+    Tags are formatted with the view arguments, e.g. 'venue:{venue_id}'.
+    Requests with flashed messages pending are rendered without the cache,
+    since the layout shows them.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            cache = current_app.extensions.get('page_cache')
+            if cache is None or not current_app.config['PAGE_CACHE']:
+                return view(**kwargs)
+            if '_flashes' in session:
+                cache._count('bypasses')
+                return view(**kwargs)
+            page, hit = cache.fetch(
+                request.full_path,
+                [tag.format(**kwargs) for tag in tags],
+                lambda: view(**kwargs)
+            )
+            return page, {'X-Cache': 'HIT' if hit else 'MISS'}
+        return wrapper
+    return decorator
+
+
+def invalidate(*tags):
+    """Invalidates tags in the page cache of the current app, if any."""
+    if has_app_context():
+        cache = current_app.extensions.get('page_cache')
+        if cache is not None:
+            cache.invalidate(*tags)
@@ -1,12 +1,253 @@
 #!/usr/bin/env python3
+"""Populates the Fyyur database.
 
-from app import db, Artist, Venue, Show
+With no arguments the hand-written sample venues, artists and shows are
+added. Given any of --venues, --artists or --shows, that many synthetic
+rows are generated deterministically from --seed and bulk inserted in
+batches: through COPY on PostgreSQL and executemany elsewhere.
+"""
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+from datetime import datetime, timedelta
 
+from app import app
+from models.artist import Artist
+from models.genre import Genre, artist_genre, venue_genre
+from models.geo import geohash, geocode
+from models.model import Model, db
+from models.show import SHOW_LENGTH, Show
+from models.venue import Venue
 
-def main():
+
+GENRES = [
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+    'Swing', 'Other',
+]
+WORDS = [
+    'amber', 'anchor', 'arrow', 'atlas', 'basement', 'blue', 'brass',
+    'canyon', 'cedar', 'cobalt', 'copper', 'crow', 'delta', 'echo', 'ember',
+    'fox', 'gold', 'harbor', 'hollow', 'iron', 'ivory', 'lantern', 'lucky',
+    'marble', 'midnight', 'neon', 'north', 'oak', 'owl', 'pearl', 'piano',
+    'river', 'rust', 'salt', 'silver', 'static', 'stone', 'velvet', 'wild',
+    'willow',
+]
+VENUE_KINDS = ['Hall', 'Lounge', 'Club', 'Theater', 'Bar', 'Room', 'Garden']
+ARTIST_KINDS = ['Band', 'Trio', 'Quartet', 'Collective', 'Orchestra', 'Duo']
+CITIES = [
+    ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('New York', 'NY'),
+    ('Austin', 'TX'), ('Chicago', 'IL'), ('Seattle', 'WA'), ('Denver', 'CO'),
+    ('Nashville', 'TN'), ('New Orleans', 'LA'), ('Portland', 'OR'),
+    ('Atlanta', 'GA'), ('Boston', 'MA'), ('Detroit', 'MI'), ('Miami', 'FL'),
+]
+# Four hour show slots, a year either side of the epoch.
+SHOW_SLOTS = range(-2190, 2191)
+
+
+def generate_venues(rng, count, first_id):
+    for venue_id in range(first_id, first_id + count):
+        city, state = rng.choice(CITIES)
+        name = ' '.join(rng.sample(WORDS, 2)).title()
+        # Spread venues over the metro area around the city centre.
+        latitude, longitude = geocode(city, state)
+        latitude += rng.uniform(-0.5, 0.5)
+        longitude += rng.uniform(-0.5, 0.5)
+        yield {
+            'id': venue_id,
+            'name': f'The {name} {rng.choice(VENUE_KINDS)}',
+            'city': city,
+            'state': state,
+            'address': f'{rng.randint(1, 9999)} {rng.choice(WORDS).title()} Street',
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+            'seeking_talent': rng.random() < 0.3,
+            'latitude': latitude,
+            'longitude': longitude,
+            'geohash': geohash(latitude, longitude),
+        }
+
+
+def generate_artists(rng, count, first_id):
+    for artist_id in range(first_id, first_id + count):
+        city, state = rng.choice(CITIES)
+        name = ' '.join(rng.sample(WORDS, 2)).title()
+        yield {
+            'id': artist_id,
+            'name': f'{name} {rng.choice(ARTIST_KINDS)}',
+            'city': city,
+            'state': state,
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+            'seeking_venue': rng.random() < 0.3,
+        }
+
+
+def generate_genre_links(rng, owner, owner_ids, genre_ids):
+    for owner_id in owner_ids:
+        for genre_id in rng.sample(genre_ids, rng.randint(1, 3)):
+            yield {f'{owner}_id': owner_id, 'genre_id': genre_id}
+
+
+def generate_shows(rng, count, venue_ids, artist_ids, epoch):
+    """Books shows in four hour slots, never two at once for a venue or an
+    artist.
+
+    Each slot holds as many shows as there are venues or artists, whichever
+    is fewer, and count of those places are drawn without replacement, so
+    nothing is ever drawn twice.
+
+    Raises: ValueError if count shows do not fit in the slots.
+    """
+    lanes = min(len(venue_ids), len(artist_ids))
+    if count > lanes * len(SHOW_SLOTS):
+        raise ValueError(f'{count:,} shows do not fit in {len(SHOW_SLOTS):,} '
+                         f'slots of {len(venue_ids):,} venues and '
+                         f'{len(artist_ids):,} artists.')
+    # The lanes of a slot go to consecutive venues and artists from a
+    # random offset, which keeps them distinct within the slot.
+    offsets = {}
+    for place in rng.sample(range(lanes * len(SHOW_SLOTS)), count):
+        index, lane = divmod(place, lanes)
+        if index not in offsets:
+            offsets[index] = (rng.randrange(len(venue_ids)),
+                              rng.randrange(len(artist_ids)))
+        venue_offset, artist_offset = offsets[index]
+        start_time = epoch + timedelta(hours=4 * SHOW_SLOTS[index])
+        yield {
+            'venue_id': venue_ids[(venue_offset + lane) % len(venue_ids)],
+            'artist_id': artist_ids[(artist_offset + lane) % len(artist_ids)],
+            'start_time': start_time,
+            'end_time': start_time + SHOW_LENGTH,
+        }
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy(connection, table, batch):
+    """Streams a batch into PostgreSQL with COPY ... FROM STDIN."""
+    columns = list(batch[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow(['' if row[column] is None else row[column]
+                         for column in columns])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    cursor.copy_expert(
+        f'COPY "{table.name}" ({", ".join(columns)}) FROM STDIN WITH CSV',
+        buffer
+    )
+    cursor.close()
+
+
+def bulk_insert(table, rows, batch_size=10000, report=None):
+    """Inserts rows into table one batch per transaction and returns
+    the number of rows inserted."""
+    use_copy = (db.engine.dialect.name == 'postgresql'
+                and db.engine.driver == 'psycopg2')
+    inserted = 0
+    start = time.perf_counter()
+    for batch in _batches(rows, batch_size):
+        with db.engine.begin() as connection:
+            if use_copy:
+                _copy(connection, table, batch)
+            else:
+                connection.execute(table.insert(), batch)
+        inserted += len(batch)
+        if report:
+            elapsed = time.perf_counter() - start
+            report(f'{table.name}: {inserted:,} rows '
+                   f'({inserted / elapsed:,.0f} rows/s)')
+    return inserted
+
+
+def _next_id(table):
+    return (db.session.query(db.func.max(table.c.id)).scalar() or 0) + 1
+
+
+def _reset_sequence(table):
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT max(id) FROM \"{table.name}\"))"
+        )
+        db.session.commit()
+
+
+def populate_synthetic(venues=0, artists=0, shows=0, seed=0, epoch=None,
+                       batch_size=10000, report=None):
+    """Generates and bulk inserts synthetic rows.
+
+    The same seed and epoch always produce the same data. Shows are spread
+    over a year either side of epoch, which defaults to today, between all
+    venues and artists in the database.
+    """
+    rng = random.Random(seed)
+    epoch = epoch or datetime.combine(datetime.today(), datetime.min.time())
+    start = time.perf_counter()
+    total = 0
+
+    genres = Genre.fetch_or_create(GENRES)
+    db.session.commit()
+    genre_ids = [genre.id for genre in genres]
+
+    for model, owner, links, count, generate in (
+            (Venue, 'venue', venue_genre, venues, generate_venues),
+            (Artist, 'artist', artist_genre, artists, generate_artists)):
+        if not count:
+            continue
+        table = model.__table__
+        first_id = _next_id(table)
+        total += bulk_insert(table, generate(rng, count, first_id),
+                             batch_size, report)
+        _reset_sequence(table)
+        owner_ids = range(first_id, first_id + count)
+        total += bulk_insert(
+            links,
+            generate_genre_links(rng, owner, owner_ids, genre_ids),
+            batch_size,
+            report
+        )
+
+    if shows:
+        venue_ids = [row.id for row in db.session.query(Venue.id)]
+        artist_ids = [row.id for row in db.session.query(Artist.id)]
+        if not venue_ids or not artist_ids:
+            raise ValueError('Shows need at least one venue and one artist.')
+        total += bulk_insert(
+            Show.__table__,
+            generate_shows(rng, shows, venue_ids, artist_ids, epoch),
+            batch_size,
+            report
+        )
+        # Bulk inserts skip the model hooks, so count upcoming shows here.
+        for model in (Venue, Artist):
+            model.refresh_show_counters()
+        db.session.commit()
+
+    elapsed = time.perf_counter() - start
+    if report:
+        report(f'inserted {total:,} rows in {elapsed:.1f}s '
+               f'({total / elapsed if elapsed else 0:,.0f} rows/s)')
+    return total
+
+
+def populate_samples():
     db.create_all()
 
-    db.session.add(
+    with Model.unit_of_work():
         Venue(
             name='The Musical Hop',
             genres=['Jazz', 'Reggae', 'Swing', 'Classical', 'Folk'],
@@ -19,10 +260,8 @@ def main():
             seeking_talent=True,
             seeking_description='We are on the lookout for a local artist to play every two weeks. Please call us.',
             image_link='https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60',
-        )
-    )
+        ).insert()
 
-    db.session.add(
         Venue(
             name='The Dueling Pianos Bar',
             genres=['Classical', 'R&B', 'Hip-Hop'],
@@ -34,10 +273,8 @@ def main():
             facebook_link='https://www.facebook.com/theduelingpianos',
             seeking_talent=False,
             image_link='https://images.unsplash.com/photo-1497032205916-ac775f0649ae?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=750&q=80',
-        )
-    )
+        ).insert()
 
-    db.session.add(
         Venue(
             name='Park Square Live Music & Coffee',
             genres=['Rock n Roll', 'Jazz', 'Classical', 'Folk'],
@@ -49,11 +286,9 @@ def main():
             facebook_link='https://www.facebook.com/ParkSquareLiveMusicAndCoffee',
             seeking_talent=False,
             image_link='https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80',
-        )
-    )
+        ).insert()
 
 
-    db.session.add(
         Artist(
             name='Guns N Petals',
             genres=['Rock n Roll'],
@@ -65,10 +300,8 @@ def main():
             seeking_venue=True,
             seeking_description='Looking for shows to perform at in the San Francisco Bay Area!',
             image_link='https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80',
-        )
-    )
+        ).insert()
 
-    db.session.add(
         Artist(
             name='Matt Quevedo',
             genres=['Jazz'],
@@ -78,10 +311,8 @@ def main():
             facebook_link='https://www.facebook.com/mattquevedo923251523',
             seeking_venue=False,
             image_link='https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80',
-        )
-    )
+        ).insert()
 
-    db.session.add(
         Artist(
             name='The Wild Sax Band',
             genres=['Jazz', 'Classical'],
@@ -90,54 +321,71 @@ def main():
             phone='432-325-5432',
             seeking_venue=False,
             image_link='https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80',
-        )
-    )
+        ).insert()
 
 
-    db.session.add(
         Show(
             venue_id=1,
             artist_id=1,
-            start_time='2019-05-21 09:30:00 PM'
-        )
-    )
+            start_time=datetime(2019, 5, 21, 21, 30)
+        ).insert()
 
-    db.session.add(
         Show(
             venue_id=3,
             artist_id=2,
-            start_time='2019-06-15 11:00:00 PM'
-        )
-    )
+            start_time=datetime(2019, 6, 15, 23, 0)
+        ).insert()
 
-    db.session.add(
         Show(
             venue_id=3,
             artist_id=3,
-            start_time='2021-04-01 08:00:00 PM'
-        )
-    )
+            start_time=datetime(2021, 4, 1, 20, 0)
+        ).insert()
 
-    db.session.add(
         Show(
             venue_id=3,
             artist_id=3,
-            start_time='2021-04-08 08:00:00 PM'
-        )
-    )
+            start_time=datetime(2021, 4, 8, 20, 0)
+        ).insert()
 
-    db.session.add(
         Show(
             venue_id=3,
             artist_id=3,
-            start_time='2021-04-15 08:00:00 PM'
-        )
-    )
-
+            start_time=datetime(2021, 4, 15, 20, 0)
+        ).insert()
 
-    db.session.commit()
     db.session.close()
 
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--venues', type=int, default=0)
+    parser.add_argument('--artists', type=int, default=0)
+    parser.add_argument('--shows', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--epoch', type=datetime.fromisoformat, default=None,
+                        help='centre of the show calendar, defaults to today')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    if args.database_url:
+        app.config['SQLALCHEMY_DATABASE_URI'] = args.database_url
+    with app.app_context():
+        if not (args.venues or args.artists or args.shows):
+            populate_samples()
+            return
+        db.create_all()
+        populate_synthetic(
+            venues=args.venues,
+            artists=args.artists,
+            shows=args.shows,
+            seed=args.seed,
+            epoch=args.epoch,
+            batch_size=args.batch_size,
+            report=lambda message: print(message, file=sys.stderr),
+        )
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,102 @@
+"""Per-request SQL profiling for the Fyyur app.
+
+When QUERY_PROFILING is set, every statement executed while handling a
+request is timed through SQLAlchemy engine events. The response gets a
+Server-Timing header with the query count and database time, and a JSON
+summary including the slowest statements is logged. Statements slower
+than SLOW_QUERY_MS are also logged as they finish. Streamed responses are
+summarized before their body is sent, so queries issued while streaming
+are not included.
+"""
+import json
+import time
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryProfiler():
+    """Flask extension collecting per-request query statistics."""
+
+    def __init__(self, app=None):
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUERY_PROFILING', False)
+        app.config.setdefault('SLOW_QUERY_MS', 100)
+        app.config.setdefault('QUERY_PROFILING_SLOWEST', 3)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_execute)
+            self._listening = True
+
+    @staticmethod
+    def _profile():
+        if has_app_context():
+            return g.get('query_profile')
+        return None
+
+    def _start_request(self):
+        if current_app.config['QUERY_PROFILING']:
+            g.query_profile = {
+                'start': time.perf_counter(),
+                'count': 0,
+                'seconds': 0.0,
+                'statements': [],
+            }
+
+    def _before_execute(self, conn, cursor, statement, parameters, context,
+                        executemany):
+        if self._profile() is not None:
+            conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context,
+                       executemany):
+        profile = self._profile()
+        if profile is None or not conn.info.get('query_start'):
+            return
+        seconds = time.perf_counter() - conn.info['query_start'].pop()
+        profile['count'] += 1
+        profile['seconds'] += seconds
+        profile['statements'].append((seconds, statement))
+        if seconds * 1000 >= current_app.config['SLOW_QUERY_MS']:
+            current_app.logger.warning(json.dumps({
+                'event': 'slow_query',
+                'path': request.path,
+                'ms': round(seconds * 1000, 2),
+                'statement': statement,
+            }))
+
+    def _finish_request(self, response):
+        profile = g.pop('query_profile', None)
+        if profile is None:
+            return response
+        total_ms = (time.perf_counter() - profile['start']) * 1000
+        db_ms = profile['seconds'] * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_ms:.2f};desc="{profile["count"]} queries", '
+            f'total;dur={total_ms:.2f}'
+        )
+        slowest = sorted(profile['statements'], reverse=True)
+        slowest = slowest[:current_app.config['QUERY_PROFILING_SLOWEST']]
+        current_app.logger.info(json.dumps({
+            'event': 'request_profile',
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'status': response.status_code,
+            'queries': profile['count'],
+            'db_ms': round(db_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'slowest': [
+                {'ms': round(seconds * 1000, 2), 'statement': statement}
+                for seconds, statement
+                in slowest
+            ],
+        }))
+        return response
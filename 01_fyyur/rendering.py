@@ -0,0 +1,99 @@
+"""Production rendering for the Fyyur app.
+
+With PRODUCTION_RENDERING set, compiled templates are kept as bytecode in
+TEMPLATE_CACHE_DIR, so a new worker loads them from disk instead of
+parsing and compiling every template again, and templates are no longer
+checked for changes on each render. The precompile-templates command fills
+the cache ahead of time, e.g. as a deployment step.
+
+Static files linked with url_for('static', ...) also get a fingerprint of
+their content in the query string. Requests carrying the current
+fingerprint of a file are answered with STATIC_MAX_AGE cache headers
+marking it immutable, so browsers stop revalidating it; a changed file gets
+a new fingerprint and therefore a new URL. Files referenced from inside
+stylesheets, such as fonts, are not fingerprinted and keep the default
+headers.
+"""
+import hashlib
+import os
+import threading
+
+import click
+from flask import request
+from jinja2 import FileSystemBytecodeCache
+
+
+class Rendering():
+    """Flask extension for bytecode cached templates and fingerprinted
+    static files."""
+
+    def __init__(self, app=None):
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PRODUCTION_RENDERING', False)
+        app.config.setdefault('TEMPLATE_CACHE_DIR',
+                              os.path.join(app.root_path, '.template_cache'))
+        app.config.setdefault('STATIC_MAX_AGE', 365 * 24 * 60 * 60)
+        self.app = app
+        if app.config['PRODUCTION_RENDERING']:
+            directory = app.config['TEMPLATE_CACHE_DIR']
+            os.makedirs(directory, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+            app.jinja_env.auto_reload = False
+            app.url_defaults(self._fingerprint_static)
+            app.after_request(self._cache_static)
+        app.cli.command('precompile-templates')(self._precompile_command)
+
+    def fingerprint(self, filename):
+        """Returns a short hash of the content of a static file, or None
+        if it does not exist."""
+        with self._lock:
+            if filename in self._fingerprints:
+                return self._fingerprints[filename]
+        path = os.path.join(self.app.static_folder, filename)
+        try:
+            with open(path, 'rb') as file:
+                fingerprint = hashlib.md5(file.read()).hexdigest()[:12]
+        except OSError:
+            fingerprint = None
+        with self._lock:
+            self._fingerprints[filename] = fingerprint
+        return fingerprint
+
+    def precompile(self):
+        """Compiles every template into the bytecode cache, returning the
+        number of templates compiled."""
+        env = self.app.jinja_env
+        names = env.list_templates(extensions=('html',))
+        for name in names:
+            env.get_template(name)
+        return len(names)
+
+    def _precompile_command(self):
+        """Compiles every template into TEMPLATE_CACHE_DIR."""
+        if self.app.jinja_env.bytecode_cache is None:
+            raise click.ClickException('PRODUCTION_RENDERING is not set.')
+        click.echo(f'compiled {self.precompile()} templates into '
+                   f'{self.app.config["TEMPLATE_CACHE_DIR"]}')
+
+    def _fingerprint_static(self, endpoint, values):
+        if endpoint == 'static' and 'v' not in values:
+            fingerprint = self.fingerprint(values.get('filename', ''))
+            if fingerprint:
+                values['v'] = fingerprint
+
+    def _cache_static(self, response):
+        if (request.endpoint == 'static'
+                and response.status_code == 200
+                and request.args.get('v')
+                and request.args['v'] == self.fingerprint(
+                    request.view_args.get('filename', ''))):
+            response.cache_control.public = True
+            response.cache_control.max_age = self.app.config['STATIC_MAX_AGE']
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
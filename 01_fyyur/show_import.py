@@ -0,0 +1,212 @@
+"""Bulk import of shows from CSV.
+
+The file is read one row at a time and handled in batches: the artist and
+venue ids of a batch are checked with one query each, its valid rows are
+inserted with a single executemany, and the batch is committed on its own.
+A failing batch is rolled back and the error raised, leaving the batches
+before it imported. Rows that cannot be imported are reported by line
+number instead of stopping the import.
+
+The file needs a header naming at least artist_id, venue_id and start_time,
+which is ISO 8601 (2021-04-15 20:00) or US style (04/15/2021 20:00). An
+end_time column is optional; shows without one last SHOW_LENGTH. Rows
+overlapping a show already booked for their artist or venue, or an earlier
+row of the file, are rejected; each batch looks its bookings up in one
+query.
+"""
+import csv
+import time
+from datetime import datetime
+
+from models.artist import Artist
+from models.model import db
+from models.show import MAX_SHOW_LENGTH, SHOW_LENGTH, Show
+from models.venue import Venue
+from page_cache import invalidate
+
+
+COLUMNS = ('artist_id', 'venue_id', 'start_time')
+START_TIME_FORMATS = ('%m/%d/%Y %H:%M', '%m/%d/%Y %H:%M:%S')
+
+
+def parse_start_time(value):
+    """Parses a show start time, raising ValueError if it is invalid."""
+    value = (value or '').strip()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for format in START_TIME_FORMATS:
+        try:
+            return datetime.strptime(value, format)
+        except ValueError:
+            pass
+    raise ValueError(f'invalid start_time {value!r}')
+
+
+def _parse_row(row):
+    try:
+        artist_id = int(row['artist_id'])
+        venue_id = int(row['venue_id'])
+    except (TypeError, ValueError):
+        raise ValueError('artist_id and venue_id must be integers')
+    start_time = parse_start_time(row['start_time'])
+    if row.get('end_time'):
+        end_time = parse_start_time(row['end_time'])
+        if not start_time < end_time <= start_time + MAX_SHOW_LENGTH:
+            raise ValueError(f'invalid end_time {row["end_time"]!r}')
+    else:
+        end_time = start_time + SHOW_LENGTH
+    return {
+        'artist_id': artist_id,
+        'venue_id': venue_id,
+        'start_time': start_time,
+        'end_time': end_time,
+    }
+
+
+def _existing_ids(model, ids):
+    return set(
+        id
+        for (id,)
+        in db.session.query(model.id).filter(model.id.in_(ids))
+    )
+
+
+class ImportResult():
+    """Counts the shows imported and lists the rows rejected."""
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = []
+        self.seconds = 0.0
+
+    def reject(self, line, reason):
+        self.rejected.append((line, reason))
+
+    @property
+    def rows_per_second(self):
+        rows = self.imported + len(self.rejected)
+        return rows / self.seconds if self.seconds else 0.0
+
+    def to_dict(self):
+        return {
+            'imported': self.imported,
+            'rejected': [
+                {'line': line, 'reason': reason}
+                for line, reason
+                in self.rejected
+            ],
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second),
+        }
+
+
+def _bookings(rows):
+    """Maps ('artist' or 'venue', id) to the booked (start, end) times
+    around rows."""
+    bookings = {}
+    shows = (
+        db.session.query(Show.artist_id, Show.venue_id, Show.start_time,
+                         Show.end_time)
+          .filter(db.or_(
+              Show.artist_id.in_(set(row['artist_id'] for row in rows)),
+              Show.venue_id.in_(set(row['venue_id'] for row in rows))
+          ))
+          .filter(Show.overlapping(min(row['start_time'] for row in rows),
+                                   max(row['end_time'] for row in rows)))
+    )
+    for show in shows:
+        times = (show.start_time, show.end_time)
+        bookings.setdefault(('artist', show.artist_id), []).append(times)
+        bookings.setdefault(('venue', show.venue_id), []).append(times)
+    return bookings
+
+
+def _reject_conflicts(rows, result):
+    """Returns the rows not overlapping a booking or an earlier row."""
+    bookings = _bookings([row for _, row in rows])
+    accepted = []
+    for line, row in rows:
+        conflict = next((
+            owner
+            for owner in ('artist', 'venue')
+            for start, end in bookings.get((owner, row[f'{owner}_id']), ())
+            if start < row['end_time'] and row['start_time'] < end
+        ), None)
+        if conflict:
+            result.reject(line, f'{conflict} {row[f"{conflict}_id"]} is '
+                                f'already booked at {row["start_time"]}')
+            continue
+        for owner in ('artist', 'venue'):
+            bookings.setdefault((owner, row[f'{owner}_id']), []).append(
+                (row['start_time'], row['end_time'])
+            )
+        accepted.append(row)
+    return accepted
+
+
+def _import_batch(batch, result):
+    artist_ids = _existing_ids(Artist, set(row['artist_id'] for _, row in batch))
+    venue_ids = _existing_ids(Venue, set(row['venue_id'] for _, row in batch))
+    shows = []
+    for line, row in batch:
+        if row['artist_id'] not in artist_ids:
+            result.reject(line, f'unknown artist_id {row["artist_id"]}')
+        elif row['venue_id'] not in venue_ids:
+            result.reject(line, f'unknown venue_id {row["venue_id"]}')
+        else:
+            shows.append((line, row))
+    if not shows:
+        return
+    shows = _reject_conflicts(shows, result)
+    if not shows:
+        return
+
+    artist_ids = set(show['artist_id'] for show in shows)
+    venue_ids = set(show['venue_id'] for show in shows)
+    try:
+        db.session.execute(Show.__table__.insert(), shows)
+        # The insert skips the Show hooks, so recount here.
+        Artist.refresh_show_counters(artist_ids)
+        Venue.refresh_show_counters(venue_ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    result.imported += len(shows)
+    invalidate(
+        'show',
+        'artist',
+        'venue',
+        *(f'artist:{id}' for id in artist_ids),
+        *(f'venue:{id}' for id in venue_ids)
+    )
+
+
+def import_shows(lines, batch_size=1000):
+    """Imports shows from an iterable of CSV lines, such as an open file.
+
+    Raises ValueError if the header lacks a required column.
+    """
+    start = time.perf_counter()
+    result = ImportResult()
+    reader = csv.DictReader(lines)
+    missing = set(COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f'missing columns: {", ".join(sorted(missing))}')
+
+    batch = []
+    for row in reader:
+        try:
+            batch.append((reader.line_num, _parse_row(row)))
+        except ValueError as e:
+            result.reject(reader.line_num, str(e))
+        if len(batch) == batch_size:
+            _import_batch(batch, result)
+            batch = []
+    if batch:
+        _import_batch(batch, result)
+    result.rejected.sort()
+    result.seconds = time.perf_counter() - start
+    return result
@@ -0,0 +1,806 @@
+import io
+import os
+import random
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from flask import Flask, url_for
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError
+
+from app import app, job_queue, page_cache
+from jobs import TASKS
+from models.artist import Artist
+from models.cursor import encode_cursor
+from models.genre import Genre
+from models.job import DeadJob, Job
+from models.geo import distance_km
+from models.model import Model, db
+from models.show import Show
+from models.venue import Venue
+from db_pool import InstrumentedQueuePool, pool_stats
+from page_cache import MemoryBackend
+from populate import SHOW_SLOTS, generate_shows, populate_synthetic
+from rendering import Rendering
+from show_import import import_shows
+
+
+class FyyurTestCase(unittest.TestCase):
+    """This class represents the Fyyur test case"""
+
+    def setUp(self):
+        """Define test variables and initialize app."""
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        app.config['PAGE_CACHE'] = False
+        page_cache.clear()
+        self.client = app.test_client()
+        self.context = app.app_context()
+        self.context.push()
+        db.create_all()
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        """Executed after reach test"""
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def _record(self, conn, cursor, statement, parameters, context, many):
+        self.statements.append(statement)
+
+    def _count_queries(self, url):
+        self.statements.clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(self.statements)
+
+    def _seed_shows(self, count):
+        venue = Venue(name='The Musical Hop', city='San Francisco',
+                      state='CA', seeking_talent=False)
+        db.session.add(venue)
+        now = datetime.now()
+        for i in range(count):
+            artist = Artist(name=f'Artist {i}', seeking_venue=False)
+            offset = timedelta(days=i + 1)
+            db.session.add_all([
+                Show(venue=venue, artist=artist, start_time=now - offset),
+                Show(venue=venue, artist=artist, start_time=now + offset),
+            ])
+        db.session.commit()
+        return venue.id, artist.id
+
+    def test_view_venue_splits_shows(self):
+        venue_id, _ = self._seed_shows(3)
+        db.session.expunge_all()
+        venue = Venue.fetch_with_shows(venue_id)
+        self.assertEqual(venue.past_shows_count, 3)
+        self.assertEqual(venue.upcoming_shows_count, 3)
+        self.assertEqual(venue.upcoming_shows[0].artist_name, 'Artist 0')
+
+    def test_view_venue_query_count_is_constant(self):
+        venue_id, _ = self._seed_shows(1)
+        few = self._count_queries(f'/venues/{venue_id}')
+        self.assertEqual(few, 2)
+        db.session.remove()
+        venue_id, _ = self._seed_shows(50)
+        many = self._count_queries(f'/venues/{venue_id}')
+        self.assertEqual(few, many)
+
+    def test_view_artist_query_count_is_constant(self):
+        _, artist_id = self._seed_shows(1)
+        few = self._count_queries(f'/artists/{artist_id}')
+        db.session.remove()
+        artist = Artist.query.get(artist_id)
+        venue = Venue(name='Park Square', seeking_talent=False)
+        start_time = datetime.now() + timedelta(days=1)
+        db.session.add_all(
+            Show(venue=venue, artist=artist, start_time=start_time)
+            for _ in range(50)
+        )
+        db.session.commit()
+        many = self._count_queries(f'/artists/{artist_id}')
+        self.assertEqual(few, many)
+
+    def _seed_cities(self, count):
+        db.session.add_all(
+            Venue(name=f'Venue {i}{j}', city=f'City {i}', state='CA',
+                  seeking_talent=False)
+            for i in range(count)
+            for j in range(2)
+        )
+        db.session.commit()
+
+    def test_fetch_areas_groups_venues(self):
+        self._seed_cities(3)
+        areas = Venue.fetch_areas()
+        self.assertEqual([area['city'] for area in areas],
+                         ['City 0', 'City 1', 'City 2'])
+        self.assertEqual([venue.name for venue in areas[1]['venues']],
+                         ['Venue 10', 'Venue 11'])
+
+    def test_fetch_areas_paginates_by_area(self):
+        self._seed_cities(3)
+        areas = Venue.fetch_areas(page=2, per_page=2)
+        self.assertEqual(len(areas), 1)
+        self.assertEqual(areas[0]['city'], 'City 2')
+        self.assertEqual(len(areas[0]['venues']), 2)
+        for page in (0, -3):
+            self.assertEqual(
+                self.client.get(f'/venues/?page={page}').status_code, 400
+            )
+
+    def test_list_venues_query_count_is_constant(self):
+        self._seed_cities(1)
+        few = self._count_queries('/venues/')
+        self._seed_cities(20)
+        many = self._count_queries('/venues/')
+        self.assertEqual(few, many)
+
+    def test_fetch_show_page_follows_cursor(self):
+        self._seed_shows(3)
+        first = Show.fetch_page(per_page=4)
+        self.assertEqual(len(list(first)), 4)
+        self.assertIsNotNone(first.next_cursor)
+        second = Show.fetch_page(after=first.next_cursor, per_page=4)
+        rows = list(second)
+        self.assertEqual(len(rows), 2)
+        self.assertIsNone(second.next_cursor)
+        self.assertEqual(rows[0].artist_name, 'Artist 1')
+
+    def test_list_shows_query_count_is_constant(self):
+        self._seed_shows(1)
+        few = self._count_queries('/shows')
+        self._seed_shows(15)
+        many = self._count_queries('/shows')
+        self.assertEqual(few, many)
+
+    def test_list_shows_streams_template(self):
+        self._seed_shows(1)
+        app.config['STREAM_TEMPLATES'] = True
+        try:
+            response = self.client.get('/shows')
+        finally:
+            app.config['STREAM_TEMPLATES'] = False
+        self.assertTrue(response.is_streamed)
+        self.assertIn(b'Artist 0', response.data)
+
+    def test_list_shows_rejects_bad_cursor(self):
+        response = self.client.get('/shows?after=garbage')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_matches_name_city_and_genres(self):
+        db.session.add_all([
+            Artist(name='Guns N Petals', city='San Francisco',
+                   genres=['Rock n Roll'], seeking_venue=False),
+            Artist(name='Matt Quevedo', city='New York',
+                   genres=['Jazz'], seeking_venue=False),
+            Artist(name='The Wild Sax Band', city='San Francisco',
+                   genres=['Jazz'], seeking_venue=False),
+        ])
+        db.session.commit()
+        names = lambda artists: sorted(artist.name for artist in artists)
+        self.assertEqual(names(Artist.search('petal')), ['Guns N Petals'])
+        self.assertEqual(names(Artist.search('FRANCISCO')),
+                         ['Guns N Petals', 'The Wild Sax Band'])
+        self.assertEqual(names(Artist.search('jazz')),
+                         ['Matt Quevedo', 'The Wild Sax Band'])
+        self.assertEqual(len(Artist.search('an', limit=1)), 1)
+        self.assertEqual(Artist.search('100%'), [])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        venue.insert()
+        venue.update(name='The Dueling Pianos Bar')
+        self.assertEqual(Venue.search('musical'), [])
+        self.assertEqual(len(Venue.search('pianos')), 1)
+        venue.delete()
+        self.assertEqual(Venue.search('pianos'), [])
+
+    def test_genres_are_shared_rows(self):
+        hop = Venue(name='The Musical Hop', seeking_talent=False,
+                    genres=['Jazz', 'Swing', 'Jazz'])
+        bar = Venue(name='The Dueling Pianos Bar', seeking_talent=False,
+                    genres=['Swing', 'R&B'])
+        db.session.add_all([hop, bar])
+        db.session.commit()
+        self.assertEqual(hop.genres, ['Jazz', 'Swing'])
+        self.assertEqual(Genre.query.count(), 3)
+
+    def test_browse_by_genre(self):
+        db.session.add_all([
+            Venue(name='The Musical Hop', city='San Francisco', state='CA',
+                  seeking_talent=False, genres=['Jazz', 'Swing']),
+            Venue(name='Park Square', city='San Francisco', state='CA',
+                  seeking_talent=False, genres=['Folk']),
+            Artist(name='Matt Quevedo', seeking_venue=False, genres=['Jazz']),
+            Artist(name='Guns N Petals', seeking_venue=False, genres=['Folk']),
+        ])
+        db.session.commit()
+        areas = Venue.fetch_areas(genre='Jazz')
+        self.assertEqual([venue.name for venue in areas[0]['venues']],
+                         ['The Musical Hop'])
+        response = self.client.get('/artists?genre=Jazz')
+        self.assertIn(b'Matt Quevedo', response.data)
+        self.assertNotIn(b'Guns N Petals', response.data)
+
+    def test_query_profiling_reports_server_timing(self):
+        venue_id, _ = self._seed_shows(2)
+        app.config['QUERY_PROFILING'] = True
+        try:
+            with self.assertLogs(app.logger, 'INFO') as logs:
+                response = self.client.get(f'/venues/{venue_id}')
+        finally:
+            app.config['QUERY_PROFILING'] = False
+        self.assertIn('db;dur=', response.headers['Server-Timing'])
+        self.assertIn('desc="2 queries"', response.headers['Server-Timing'])
+        self.assertIn('"queries": 2', logs.output[-1])
+
+    def test_query_profiling_is_off_by_default(self):
+        response = self.client.get('/venues/')
+        self.assertNotIn('Server-Timing', response.headers)
+
+    def _insert_show(self, venue, artist, days):
+        show = Show(venue_id=venue.id, artist_id=artist.id,
+                    start_time=datetime.now() + timedelta(days=days))
+        show.insert()
+        return show
+
+    def test_show_counters_follow_inserts_and_deletes(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        venue.insert()
+        artist.insert()
+        self._insert_show(venue, artist, -1)
+        soon = self._insert_show(venue, artist, 1)
+        self._insert_show(venue, artist, 2)
+        self.assertEqual(venue.upcoming_show_count, 2)
+        self.assertEqual(artist.upcoming_show_count, 2)
+        self.assertEqual(venue.next_show_time, soon.start_time)
+
+        soon.delete()
+        self.assertEqual(venue.upcoming_show_count, 1)
+        self.assertGreater(venue.next_show_time, soon.start_time)
+
+        other = Venue(name='Park Square', seeking_talent=False)
+        other.insert()
+        self._insert_show(other, artist, 3)
+        self.assertEqual(artist.upcoming_show_count, 2)
+        self.statements.clear()
+        other.delete()
+        self.assertEqual(len([statement for statement in self.statements
+                              if 'DISTINCT' in statement]), 1)
+        # Artists are recounted in the background.
+        self.assertEqual(Job.query.one().payload,
+                         {'table': 'artist', 'ids': [artist.id]})
+        self.assertEqual(job_queue.run_pending(), 1)
+        db.session.refresh(artist)
+        self.assertEqual(artist.upcoming_show_count, 1)
+        self.assertEqual(Job.query.count(), 0)
+
+    def test_show_counters_follow_moved_shows(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        other = Venue(name='Park Square', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        drummer = Artist(name='Matt Quevedo', seeking_venue=False)
+        for row in (venue, other, artist, drummer):
+            row.insert()
+        show = self._insert_show(venue, artist, 1)
+
+        show.update(venue_id=other.id)
+        self.assertEqual(venue.upcoming_show_count, 0)
+        self.assertEqual(other.upcoming_show_count, 1)
+
+        with Model.unit_of_work():
+            show.update(artist_id=drummer.id)
+        self.assertEqual(artist.upcoming_show_count, 0)
+        self.assertEqual(drummer.upcoming_show_count, 1)
+        self.assertIsNone(artist.next_show_time)
+
+    def test_upcoming_shows_follow_local_time(self):
+        # Five hours behind UTC, the SQLite clock.
+        self.addCleanup(time.tzset)
+        self.addCleanup(os.environ.__setitem__, 'TZ',
+                        os.environ.get('TZ', 'UTC'))
+        os.environ['TZ'] = 'Etc/GMT+5'
+        time.tzset()
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        venue.insert()
+        artist.insert()
+        show = Show(venue_id=venue.id, artist_id=artist.id,
+                    start_time=datetime.now() + timedelta(hours=1))
+        show.insert()
+        self.assertEqual(venue.upcoming_show_count, 1)
+        Venue.refresh_show_counters()
+        self.assertEqual(venue.upcoming_show_count, 1)
+        db.session.expire(show)
+        self.assertTrue(show.is_upcoming)
+
+    def test_refresh_show_counters_rolls_started_shows(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        venue.insert()
+        artist.insert()
+        show = self._insert_show(venue, artist, 1)
+        # Let two days pass without touching the counters.
+        started = show.start_time - timedelta(days=2)
+        for table, column in ((Show.__table__, 'start_time'),
+                              (Venue.__table__, 'next_show_time'),
+                              (Artist.__table__, 'next_show_time')):
+            db.session.execute(table.update().values({column: started}))
+        db.session.commit()
+        self.assertEqual(venue.upcoming_show_count, 1)
+
+        result = app.test_cli_runner().invoke(args=['refresh-show-counters'])
+        self.assertEqual(result.exit_code, 0)
+        db.session.expire_all()
+        self.assertEqual(venue.upcoming_show_count, 0)
+        self.assertIsNone(artist.next_show_time)
+
+    def test_page_cache_serves_pages_until_a_write(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        venue.insert()
+        artist.insert()
+        self._insert_show(venue, artist, 1)
+        url = f'/venues/{venue.id}'
+        app.config['PAGE_CACHE'] = True
+        try:
+            self.assertEqual(self.client.get(url).headers['X-Cache'], 'MISS')
+            self.assertEqual(self._count_queries(url), 0)
+            artist.update(name='The Wild Sax Band')
+            response = self.client.get(url)
+            self.assertEqual(response.headers['X-Cache'], 'MISS')
+            self.assertIn(b'The Wild Sax Band', response.data)
+            self.client.get('/venues/')
+            venue.delete()
+            self.assertNotIn(b'The Musical Hop',
+                             self.client.get('/venues/').data)
+        finally:
+            app.config['PAGE_CACHE'] = False
+        stats = self.client.get('/stats/cache').get_json()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 4))
+
+    def test_memory_backend_evicts_and_expires(self):
+        backend = MemoryBackend(max_entries=2)
+        backend.set('a', 'A', ttl=60)
+        backend.set('b', 'B', ttl=60)
+        backend.get('a')
+        backend.set('c', 'C', ttl=60)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('a'), 'A')
+        backend.set('a', 'A', ttl=0)
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(backend.stats(), {'entries': 1, 'evictions': 1})
+
+    def test_import_shows_rejects_bad_rows(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        venue.insert()
+        artist.insert()
+        soon = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d %H:%M')
+        lines = [
+            'artist_id,venue_id,start_time',
+            f'{artist.id},{venue.id},{soon}',
+            f'{artist.id},{venue.id},04/15/2019 20:00',
+            f'{artist.id},999,{soon}',
+            f'x,{venue.id},{soon}',
+            f'{artist.id},{venue.id},tomorrow',
+            f'{artist.id},{venue.id},2019-05-21T21:30:00',
+        ]
+        result = import_shows(lines, batch_size=2)
+        self.assertEqual(result.imported, 3)
+        self.assertEqual([line for line, _ in result.rejected], [4, 5, 6])
+        self.assertIn('unknown venue_id 999', result.rejected[0][1])
+        self.assertEqual(Show.query.count(), 3)
+        self.assertEqual(venue.upcoming_show_count, 1)
+
+    def test_import_shows_upload(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        venue.insert()
+        artist.insert()
+        rows = '\n'.join(['artist_id,venue_id,start_time'] + [
+            f'{artist.id},{venue.id},2019-06-{day:02} 20:00'
+            for day in range(1, 31)
+        ])
+        response = self.client.post('/shows/import', data={
+            'file': (io.BytesIO(rows.encode()), 'season.csv'),
+        })
+        self.assertEqual(response.get_json()['imported'], 30)
+        response = self.client.post('/shows/import', data={
+            'file': (io.BytesIO(b'artist,venue\n'), 'bad.csv'),
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_unit_of_work_batches_inserts(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        venue.insert()
+        artist.insert()
+        start_time = datetime.now() + timedelta(days=1)
+        self.statements.clear()
+        with Model.unit_of_work():
+            for _ in range(20):
+                Show(venue_id=venue.id, artist_id=artist.id,
+                     start_time=start_time).insert()
+            venue.update(name='The Dueling Pianos Bar')
+        inserts = [statement for statement in self.statements
+                   if statement.startswith('INSERT INTO show')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Show.query.count(), 20)
+        self.assertEqual(venue.upcoming_show_count, 20)
+        self.assertEqual(venue.name, 'The Dueling Pianos Bar')
+
+    def test_unit_of_work_resolves_relationships(self):
+        with Model.unit_of_work():
+            venue = Venue(name='The Musical Hop', seeking_talent=False,
+                          genres=['Jazz'])
+            artist = Artist(name='Guns N Petals', seeking_venue=False)
+            venue.insert()
+            artist.insert()
+            Show(venue=venue, artist=artist,
+                 start_time=datetime.now() + timedelta(days=1)).insert()
+            dropped = Artist(name='Matt Quevedo', seeking_venue=False)
+            dropped.insert()
+            dropped.delete()
+        self.assertEqual(Artist.query.count(), 1)
+        self.assertEqual(artist.upcoming_show_count, 1)
+        self.assertEqual(venue.genres, ['Jazz'])
+
+    def test_unit_of_work_rolls_back_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with Model.unit_of_work():
+                Venue(name='The Musical Hop', seeking_talent=False).insert()
+                raise RuntimeError
+        self.assertEqual(Venue.query.count(), 0)
+
+    def _seed_artists(self, count):
+        db.session.add_all(
+            Artist(name=f'Artist {i:02}', seeking_venue=False,
+                   upcoming_show_count=i % 3)
+            for i in range(count)
+        )
+        db.session.commit()
+
+    def test_fetch_artist_page_follows_cursor(self):
+        self._seed_artists(7)
+        db.session.add(Artist(name='Artist 00', seeking_venue=False))
+        db.session.commit()
+        names = []
+        after = None
+        while True:
+            page = Artist.fetch_page(after=after, per_page=3)
+            names += [(artist.name, artist.id) for artist in page]
+            if page.next_cursor is None:
+                break
+            after = page.next_cursor
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(names), 8)
+
+        page = Artist.fetch_page(per_page=3, most_active=True)
+        self.assertEqual([artist.name for artist in page],
+                         ['Artist 02', 'Artist 05', 'Artist 01'])
+        page = Artist.fetch_page(after=page.next_cursor, per_page=3,
+                                 most_active=True)
+        self.assertEqual([artist.name for artist in page],
+                         ['Artist 04', 'Artist 00', 'Artist 00'])
+
+    def test_list_artists_json_caps_page_size(self):
+        self._seed_artists(5)
+        app.config['ARTISTS_PER_PAGE_MAX'] = 2
+        try:
+            first = self.client.get('/artists/page?per_page=100').get_json()
+            second = self.client.get(first['next']).get_json()
+        finally:
+            app.config['ARTISTS_PER_PAGE_MAX'] = 200
+        self.assertEqual([artist['name'] for artist in first['data']],
+                         ['Artist 00', 'Artist 01'])
+        self.assertEqual([artist['name'] for artist in second['data']],
+                         ['Artist 02', 'Artist 03'])
+        for cursor in ('garbage', encode_cursor([1], [2]),
+                       encode_cursor('Artist 01', 'x')):
+            self.assertEqual(
+                self.client.get(f'/artists/page?after={cursor}').status_code,
+                400
+            )
+        self.assertEqual(self.client.get(
+            f"/artists/page?sort=active&after={encode_cursor('a', 1)}"
+        ).status_code, 400)
+
+    def test_list_artists_query_count_is_constant(self):
+        self._seed_artists(1)
+        few = self._count_queries('/artists?per_page=10')
+        self._seed_artists(30)
+        many = self._count_queries('/artists?per_page=10')
+        self.assertEqual(few, many)
+
+    def test_pool_stats_count_waits_and_timeouts(self):
+        engine = create_engine('sqlite://', poolclass=InstrumentedQueuePool,
+                               pool_size=1, max_overflow=0, pool_timeout=0.05,
+                               connect_args={'check_same_thread': False})
+        held = engine.connect()
+        with self.assertRaises(TimeoutError):
+            engine.connect()
+        stats = pool_stats(engine)
+        held.close()
+        self.assertEqual(stats['checked_out'], 1)
+        self.assertEqual(stats['checkouts'], 1)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['overflow'], 0)
+        response = self.client.get('/stats/pool')
+        self.assertEqual(response.get_json(), {'pool': 'StaticPool'})
+
+    def test_book_rejects_overlapping_shows(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        other_venue = Venue(name='Park Square', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        other_artist = Artist(name='Matt Quevedo', seeking_venue=False)
+        for row in (venue, other_venue, artist, other_artist):
+            row.insert()
+        start = datetime(2030, 5, 1, 20, 0)
+        show = Show.book(artist.id, venue.id, start)
+        self.assertEqual(show.end_time, datetime(2030, 5, 1, 23, 0))
+
+        with self.assertRaisesRegex(ValueError, 'venue is already booked'):
+            Show.book(other_artist.id, venue.id, start + timedelta(hours=2))
+        with self.assertRaisesRegex(ValueError, 'artist is already booked'):
+            Show.book(artist.id, other_venue.id, start - timedelta(hours=1))
+        with self.assertRaises(ValueError):
+            Show.book(other_artist.id, other_venue.id, start,
+                      start + timedelta(days=1))
+        Show.book(other_artist.id, venue.id, start + timedelta(hours=3))
+        self.assertEqual(Show.query.count(), 2)
+
+    def test_create_show_reports_bad_input_apart_from_conflicts(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        venue.insert()
+        artist.insert()
+        form = {'artist_id': artist.id, 'venue_id': venue.id,
+                'start_time': '2030-05-01 20:00'}
+
+        def post(**changes):
+            return self.client.post('/shows/create',
+                                    data=dict(form, **changes)).get_data(True)
+
+        self.assertIn('The show was successfully listed.', post())
+        page = post(artist_id='abc')
+        self.assertIn('ids must be numbers', page)
+        self.assertNotIn('invalid literal', page)
+        self.assertIn('ids must be numbers', post(start_time='soon'))
+        self.assertIn('is already booked from', post())
+        self.assertEqual(Show.query.count(), 1)
+
+    def test_venue_availability_lists_gaps(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        venue.insert()
+        artist.insert()
+        Show.book(artist.id, venue.id, datetime(2030, 5, 1, 20, 0))
+        Show.book(artist.id, venue.id, datetime(2030, 5, 2, 0, 0),
+                  datetime(2030, 5, 2, 1, 0))
+        Show.book(artist.id, venue.id, datetime(2030, 4, 30, 22, 0))
+        response = self.client.get(f'/venues/{venue.id}/availability'
+                                   '?from=2030-05-01&to=2030-05-03'
+                                   '&min_minutes=120')
+        self.assertEqual(response.get_json()['free'], [
+            {'start': '2030-05-01T01:00:00', 'end': '2030-05-01T20:00:00'},
+            {'start': '2030-05-02T01:00:00', 'end': '2030-05-03T00:00:00'},
+        ])
+        response = self.client.get(f'/venues/{venue.id}/availability'
+                                   '?from=2030-05-01&to=2031-05-01')
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_shows_rejects_conflicts(self):
+        venue = Venue(name='The Musical Hop', seeking_talent=False)
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        venue.insert()
+        artist.insert()
+        Show.book(artist.id, venue.id, datetime(2030, 5, 1, 20, 0))
+        result = import_shows([
+            'artist_id,venue_id,start_time,end_time',
+            f'{artist.id},{venue.id},2030-05-01 22:00,',
+            f'{artist.id},{venue.id},2030-05-02 20:00,2030-05-02 21:00',
+            f'{artist.id},{venue.id},2030-05-02 20:30,',
+        ])
+        self.assertEqual(result.imported, 1)
+        self.assertEqual([line for line, _ in result.rejected], [2, 4])
+
+    def test_production_rendering_fingerprints_static_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            production = Flask('app', static_folder=app.static_folder,
+                               template_folder=app.template_folder)
+            production.config.update(PRODUCTION_RENDERING=True,
+                                     TEMPLATE_CACHE_DIR=directory)
+            production.jinja_env.filters.update(app.jinja_env.filters)
+            rendering = Rendering(production)
+            self.assertGreater(rendering.precompile(), 0)
+            self.assertTrue(os.listdir(directory))
+
+            with production.test_request_context():
+                url = url_for('static', filename='css/main.css')
+                missing = url_for('static', filename='css/missing.css')
+            self.assertRegex(url, r'^/static/css/main.css\?v=[0-9a-f]{12}$')
+            self.assertEqual(missing, '/static/css/missing.css')
+            client = production.test_client()
+            response = client.get(url)
+            self.assertTrue(response.cache_control.immutable)
+            self.assertEqual(response.cache_control.max_age, 31536000)
+            response.close()
+            response = client.get('/static/css/main.css?v=stale')
+            self.assertFalse(response.cache_control.immutable)
+            response.close()
+
+    def test_venues_are_geocoded_from_city(self):
+        venue = Venue(name='The Musical Hop', city='San Francisco',
+                      state='CA', seeking_talent=False)
+        venue.insert()
+        self.assertAlmostEqual(venue.latitude, 37.7749)
+        self.assertIsNotNone(venue.geohash)
+        venue.city, venue.state = 'New York', 'NY'
+        venue.update()
+        self.assertAlmostEqual(venue.longitude, -74.0060)
+        venue.city = 'Nowhere'
+        venue.update()
+        self.assertIsNone(venue.latitude)
+        self.assertIsNone(venue.geohash)
+
+    def test_generate_shows_is_deterministic_and_never_double_books(self):
+        epoch = datetime(2030, 1, 1, 20, 0)
+        venue_ids, artist_ids = [1, 2, 3], list(range(1, 11))
+        first, second = (
+            list(generate_shows(random.Random(7), 500, venue_ids, artist_ids,
+                                epoch))
+            for _ in range(2)
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 500)
+        for key in ('venue_id', 'artist_id'):
+            bookings = [(row[key], row['start_time']) for row in first]
+            self.assertEqual(len(set(bookings)), len(bookings))
+
+        full = list(generate_shows(random.Random(0), len(SHOW_SLOTS), [1],
+                                   [1, 2], epoch))
+        self.assertEqual(len({row['start_time'] for row in full}),
+                         len(SHOW_SLOTS))
+        with self.assertRaises(ValueError):
+            list(generate_shows(random.Random(0), 5000, [1], [1, 2], epoch))
+
+    def test_nearest_venues_match_a_full_scan(self):
+        populate_synthetic(venues=2000)
+        venues = Venue.query.all()
+        for latitude, longitude, k in ((37.8, -122.3, 5), (40.0, -100.0, 12),
+                                       (47.6, -122.3, 1), (10.0, 0.0, 3)):
+            expected = sorted(
+                venues,
+                key=lambda venue: (distance_km(latitude, longitude,
+                                               venue.latitude,
+                                               venue.longitude), venue.id)
+            )[:k]
+            found = Venue.nearest(latitude, longitude, k=k)
+            self.assertEqual([venue.id for venue, _ in found],
+                             [venue.id for venue in expected])
+
+        response = self.client.get('/venues/nearby?city=Austin&state=TX&k=3')
+        data = response.get_json()['data']
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[0]['city'], 'Austin')
+        self.assertEqual(self.client.get('/venues/nearby?lat=95&lng=0')
+                             .status_code, 400)
+        self.assertEqual(self.client.get('/venues/nearby?city=Nowhere&state=XX')
+                             .status_code, 404)
+
+    def test_create_and_delete_artist(self):
+        response = self.client.post('/artists/create', data={
+            'name': 'Guns N Petals',
+            'city': 'San Francisco',
+            'state': 'CA',
+            'genres': ['Rock n Roll'],
+        })
+        self.assertEqual(response.status_code, 200)
+        artist = Artist.query.filter_by(name='Guns N Petals').one()
+        self.assertEqual(artist.genres, ['Rock n Roll'])
+
+        response = self.client.delete(f'/artists/{artist.id}')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Artist.query.count(), 0)
+
+    def test_delete_leaves_shows_to_the_database(self):
+        venue_id, _ = self._seed_shows(20)
+        db.session.remove()
+        self.statements.clear()
+        db.session.get(Venue, venue_id).delete()
+        self.assertFalse([statement for statement in self.statements
+                          if 'show.start_time' in statement
+                          or statement.startswith('DELETE FROM show')])
+        self.assertEqual(Show.query.count(), 0)
+        self.assertEqual(len(Job.query.one().payload['ids']), 20)
+
+    def test_bulk_delete_venues(self):
+        first_id, _ = self._seed_shows(3)
+        second_id, _ = self._seed_shows(3)
+        db.session.remove()
+        self.statements.clear()
+        response = self.client.delete('/venues/',
+                                      json={'ids': [first_id, second_id]})
+        self.assertEqual(response.get_json(), {'deleted': 2})
+        self.assertEqual(len([statement for statement in self.statements
+                              if statement.startswith('DELETE')]), 1)
+        self.assertEqual((Venue.query.count(), Show.query.count()), (0, 0))
+        self.assertEqual(Job.query.one().payload['table'], 'artist')
+        job_queue.run_pending()
+
+        for url in ('/venues/', '/venues/?ids=1,x', '/artists?ids=',
+                    '/artists?ids=' + ','.join(map(str, range(1001)))):
+            self.assertEqual(self.client.delete(url).status_code, 400)
+
+    def test_failing_jobs_are_retried_then_buried(self):
+        attempts = []
+
+        def flaky(value):
+            attempts.append(value)
+            raise RuntimeError('unavailable')
+
+        TASKS['flaky'] = flaky
+        self.addCleanup(TASKS.pop, 'flaky')
+        app.config.update(JOB_MAX_ATTEMPTS=2, JOB_RETRY_SECONDS=0)
+        self.addCleanup(app.config.update, JOB_MAX_ATTEMPTS=5,
+                        JOB_RETRY_SECONDS=10)
+        Model.defer('flaky', value=1)
+        Model.defer('missing')
+        db.session.commit()
+        self.assertEqual(self.client.get('/stats/jobs').get_json()['due'], 2)
+
+        job_queue.run_pending()
+        job = Job.query.one()
+        self.assertEqual((job.task, job.attempts), ('flaky', 1))
+        self.assertIn('unavailable', job.last_error)
+        job_queue.run_pending()
+        self.assertEqual(attempts, [1, 1])
+        self.assertEqual(Job.query.count(), 0)
+        self.assertEqual(sorted(job.task for job in DeadJob.query),
+                         ['flaky', 'missing'])
+
+        stats = self.client.get('/stats/jobs').get_json()
+        self.assertEqual((stats['queued'], stats['dead']), (0, 2))
+        self.assertEqual(job_queue.requeue_dead(), 2)
+        self.assertEqual(Job.query.count(), 2)
+
+    def test_failing_job_deleted_while_running_is_dropped(self):
+        def vanish():
+            db.session.query(Job).delete()
+            db.session.commit()
+            raise RuntimeError('unavailable')
+
+        TASKS['vanish'] = vanish
+        self.addCleanup(TASKS.pop, 'vanish')
+        Model.defer('vanish')
+        db.session.commit()
+        with self.assertLogs(app.logger, 'WARNING') as logs:
+            self.assertEqual(job_queue.run_pending(), 1)
+        self.assertIn('unavailable', logs.output[0])
+        self.assertEqual((Job.query.count(), DeadJob.query.count()), (0, 0))
+
+    def test_run_jobs_warns_of_unshared_page_cache(self):
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=['run-jobs', '--once'])
+        self.assertNotIn('PAGE_CACHE_REDIS_URL', result.output)
+        app.config['PAGE_CACHE'] = True
+        result = runner.invoke(args=['run-jobs', '--once'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('PAGE_CACHE_REDIS_URL is not set', result.output)
+
+    def test_view_missing_venue_returns_404(self):
+        response = self.client.get('/venues/999')
+        self.assertEqual(response.status_code, 404)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
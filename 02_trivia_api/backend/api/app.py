@@ -5,9 +5,12 @@ from dotenv import find_dotenv, load_dotenv
 from flask import Flask, request, abort, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS as Cors
+from werkzeug.utils import import_string
 
 import config
 
+from api.db_pool import pool_stats
+from api.exception import EndpointException
 from api.models.model import db
 
 
@@ -21,6 +24,7 @@ def create_application(config='Development'):
     # create and configure the app
     app = Flask(__name__)
     app.config.from_object(f'config.{config}Config')
+    app.json = import_string(app.config['JSON_PROVIDER'])(app)
     db.app = app
     db.init_app(app)
     db.create_all()
@@ -29,6 +33,15 @@ def create_application(config='Development'):
     with app.app_context():
         import api.resources.categories
         import api.resources.questions
+
+    @app.route('/stats/pool')
+    def connection_pool_stats():
+        return jsonify(pool_stats(db.engine))
+
+    @app.errorhandler(EndpointException)
+    def endpoint_error(error):
+        return jsonify(error.to_dict()), error.code
+
     return app
 
     @app.after_request
@@ -0,0 +1,93 @@
+"""Sized, instrumented connection pool for the trivia database.
+
+The PostgreSQL database gets an InstrumentedQueuePool sized by the pool
+options in SQLALCHEMY_ENGINE_OPTIONS, and /stats/pool reports how long
+checkouts waited for a connection and how many gave up after pool_timeout.
+The in-memory SQLite database of the tests takes no pool sizing, so the
+sizing options are dropped for it.
+
+Every worker process has its own pool, so a deployment can open up to
+workers * (pool_size + max_overflow) connections; keep that below the
+max_connections of the server.
+"""
+
+import threading
+import time
+
+from typing import Any, Dict
+
+import flask_sqlalchemy
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+POOL_SIZING = ('pool_size', 'max_overflow', 'pool_timeout')
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A QueuePool recording how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_checked_out = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            self.peak_checked_out = max(self.peak_checked_out,
+                                        self.checkedout())
+        return connection
+
+
+class SQLAlchemy(flask_sqlalchemy.SQLAlchemy):
+    """Gives the PostgreSQL database an instrumented, sized pool."""
+
+    def create_engine(self, sa_url, engine_opts):
+        options = dict(engine_opts)
+        if sa_url.drivername.startswith('sqlite'):
+            for key in POOL_SIZING:
+                options.pop(key, None)
+        else:
+            options.setdefault('poolclass', InstrumentedQueuePool)
+        return super().create_engine(sa_url, options)
+
+
+def pool_stats(engine: Engine) -> Dict[str, Any]:
+    """Returns the size, use and checkout waits of the pool of engine."""
+    pool = engine.pool
+    stats: Dict[str, Any] = {'pool': type(pool).__name__}
+    if not isinstance(pool, InstrumentedQueuePool):
+        return stats
+    with pool._stats_lock:
+        checkouts = pool.checkouts
+        stats.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+            'peak_checked_out': pool.peak_checked_out,
+            'checkouts': checkouts,
+            'timeouts': pool.timeouts,
+            'wait_ms_mean': round(
+                pool.wait_seconds * 1000 / checkouts if checkouts else 0, 3
+            ),
+            'wait_ms_max': round(pool.max_wait_seconds * 1000, 3),
+        })
+    return stats
@@ -4,16 +4,18 @@
 class EndpointException(Exception):
     """Base class for all Exceptions."""
 
+    code = 500
+
     def __init__(self, message=None, payload=None):
         super(EndpointException, self).__init__(message)
         self.message = message
         self.payload = payload
 
-#    def to_dict(self):
-#        """Return a dictionary representation of the exception."""
-#        as_dict = dict(self.payload or ())
-#        as_dict['message'] = self.message
-#        return as_dict
+    def to_dict(self):
+        """Return a dictionary representation of the exception."""
+        as_dict = dict(self.payload or ())
+        as_dict['message'] = self.message
+        return as_dict
 
 
 class BadRequestException(EndpointException):
@@ -1,5 +1,5 @@
 """Defines the trivia Category model."""
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional
 
 from api.models.model import db, Model
 
@@ -21,3 +21,21 @@ class Category(Model):
     def validate_all(cls, json: Dict[str, Any]) -> None:
         """Validates all model attributes of this resource."""
         pass
+
+    @classmethod
+    def fetch_types(cls, category_ids: Iterable[Any]) -> Dict[int, str]:
+        """Fetches the type of each of the given categories in one query,
+        keyed by category id."""
+        category_ids = {
+            int(category_id)
+            for category_id
+            in category_ids
+            if category_id is not None
+        }
+        if not category_ids:
+            return {}
+        return dict(
+            db.session.query(cls.id, cls.type)
+                      .filter(cls.id.in_(category_ids))
+                      .all()
+        )
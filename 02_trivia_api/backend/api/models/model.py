@@ -1,15 +1,25 @@
 """Defines the base Model from which all other models inherit."""
 
 import datetime
+import operator
+import threading
+import time
 
 from abc import abstractmethod
-from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
-from flask_sqlalchemy import SQLAlchemy
+from flask import current_app
+from sqlalchemy import event, text
 from sqlalchemy.ext.declarative import as_declarative
 
-from api.exception import NotFoundException, NotImplementedException
+from api.db_pool import SQLAlchemy
+from api.exception import (BadRequestException, NotFoundException,
+                           NotImplementedException)
+
+
+# Row counts of each table, with the time they were last counted exactly.
+_row_counts: Dict[str, Tuple[int, float]] = {}
+_row_counts_lock = threading.Lock()
 
 
 @as_declarative()
@@ -17,31 +27,26 @@ class Model():
     """This is the base class for database models."""
 
     __abstract__: bool = True
+    # Set by _compile_serializer when the model is mapped.
+    __column_keys__: Tuple[str, ...] = ()
+    __row__: Callable[['Model'], tuple]
 
     def json(self) -> Dict[str, Any]:
-        """Returns this resource as a dictionary."""
-        json = {}
-        for column in self.__table__.columns.keys():
-            value = getattr(self, column, None)
-            if isinstance(value, Decimal):
-                json[column] = float(value)
-            elif isinstance(value, datetime.datetime):
-                json[column] = value.isoformat()
-            elif isinstance(value, datetime.time):
-                json[column] = value.strftime('%H:%M:%S')
-            else:
-                json[column] = value
-        return json
+        """Returns this resource as a dictionary. Values are left for the
+        JSON provider to encode; see api/json_provider.py."""
+        return dict(zip(self.__column_keys__, self.__row__(self)))
 
     def delete(self) -> None:
         """Deletes this resource from the database."""
         db.session.delete(self)
         db.session.commit()
+        self._adjust_count(-1)
 
     def insert(self) -> None:
         """Inserats this resource into the database."""
         db.session.add(self)
         db.session.commit()
+        self._adjust_count(1)
 
     def update(self, **attributes: Any) -> None:
         """Updates this resource with new data and saves it to the database."""
@@ -76,35 +81,115 @@ class Model():
 #        return description
 
     @classmethod
-    def count_all(cls):
-        """Fetches the total number of rows in the database."""
-        return cls.query.count()
+    def count_all(cls, method: str = 'cached') -> int:
+        """Fetches the total number of rows in the database.
+
+        'exact' counts the rows. 'cached' returns the count kept by insert
+        and delete, counting exactly when there is none or it is older than
+        ROW_COUNT_RECONCILE_SECONDS, since other processes and bulk writes
+        change the table too. 'estimate' reads the planner's estimate from
+        pg_class on PostgreSQL, which is fast but only as fresh as the last
+        ANALYZE, and falls back to the cached count elsewhere.
+        """
+        if method == 'estimate':
+            return cls._estimate_count()
+        if method == 'cached':
+            with _row_counts_lock:
+                cached = _row_counts.get(cls.__tablename__)
+            max_age = current_app.config['ROW_COUNT_RECONCILE_SECONDS']
+            if cached and time.monotonic() - cached[1] < max_age:
+                return cached[0]
+        elif method != 'exact':
+            raise ValueError(f'Unknown count method {method!r}.')
+        count = cls.query.count()
+        with _row_counts_lock:
+            _row_counts[cls.__tablename__] = (count, time.monotonic())
+        return count
+
+    @classmethod
+    def _estimate_count(cls) -> int:
+        if db.engine.dialect.name != 'postgresql':
+            return cls.count_all('cached')
+        estimate = db.session.execute(
+            text('SELECT reltuples::bigint FROM pg_class '
+                 'WHERE oid = CAST(:table AS regclass)'),
+            {'table': cls.__tablename__}
+        ).scalar()
+        # Tables never analyzed have no estimate.
+        if estimate is None or estimate < 0:
+            return cls.count_all('cached')
+        return estimate
+
+    @classmethod
+    def _adjust_count(cls, change: int) -> None:
+        with _row_counts_lock:
+            if cls.__tablename__ in _row_counts:
+                count, counted_at = _row_counts[cls.__tablename__]
+                _row_counts[cls.__tablename__] = (count + change, counted_at)
+
+    @staticmethod
+    def forget_counts() -> None:
+        """Drops every cached row count."""
+        with _row_counts_lock:
+            _row_counts.clear()
 
     @classmethod
     def delete_by_id(cls, resource_id: int) -> None:
-        """Deletes a resource from the database."""
-        cls.query.get(resource_id).delete(synchronize_session=False)
+        """Deletes a resource from the database.
+
+        Raises: NotFoundExcepton if the requested resource is not found.
+        """
+        resource = cls.query.get(resource_id)
+        if resource is None:
+            raise NotFoundException
+        resource.delete()
 #        resource = cls.fetch_by_id(resource_id)
 #        resource.delete()
 
     @classmethod
-    def fetch_all(cls, order_by: Optional[object] = None) -> List[Dict[str, Any]]:
-        """Fetches all resources from the database."""
+    def _projection(cls, fields: Optional[Iterable[str]] = None):
+        """Returns the query of the columns of the given fields, all of them
+        by default, and the keys of the rows it returns. The id is always
+        included.
+
+        Raises: BadRequestException if a field is not a column.
+        """
+        if fields is None:
+            keys = cls.__column_keys__
+        else:
+            fields = set(fields) | {'id'}
+            unknown = fields.difference(cls.__column_keys__)
+            if unknown:
+                raise BadRequestException(
+                    f'Unknown fields: {", ".join(sorted(unknown))}.'
+                )
+            keys = tuple(key for key in cls.__column_keys__ if key in fields)
+        columns = [getattr(cls, key) for key in keys]
+        return db.session.query(*columns), keys
+
+    @classmethod
+    def fetch_all(cls,
+                  order_by: Optional[object] = None,
+                  fields: Optional[Iterable[str]] = None
+                  ) -> List[Dict[str, Any]]:
+        """Fetches all resources from the database, or only the given fields
+        of them. Rows are read as tuples, without building models."""
         #TODO: Default to order_by(primary_key)
-        return list(
-            resource.json()
-            for resource
-            in cls.query.order_by(order_by).all()
-        )
+        query, keys = cls._projection(fields)
+        return [
+            dict(zip(keys, row))
+            for row
+            in query.order_by(order_by).all()
+        ]
 
     @classmethod
     def fetch_all_filtered(cls, filter_by, order_by: Optional[object] = None):
-        print(f'filter_by is {filter_by}')
-        return list(
-            resource.json()
-            for resource
-            in cls.query.filter_by(**filter_by).order_by(order_by).all()
-        )
+        query, keys = cls._projection()
+        return [
+            dict(zip(keys, row))
+            for row
+            in query.filter_by(**filter_by).order_by(order_by).all()
+        ]
 
     @classmethod
     def fetch_by_id(cls, resource_id: int) -> List[Dict[str, Any]]:
@@ -118,12 +203,28 @@ class Model():
         return resource
 
     @classmethod
-    def fetch_page(cls, page, per_page) -> List[Dict[str, Any]]:
-        """Fetches resources from the database sorted by id and paginated."""
+    def fetch_page(cls,
+                   page: Optional[int] = None,
+                   per_page: int = 10,
+                   after: Optional[int] = None,
+                   fields: Optional[Iterable[str]] = None
+                   ) -> List[Dict[str, Any]]:
+        """Fetches resources from the database sorted by id and paginated.
+
+        With after, fetches the per_page resources following that id from
+        the primary key index, which costs the same however deep the page
+        is; numbered pages skip every earlier row with OFFSET and count the
+        table too. fields limits the columns read, as in fetch_all.
+        """
+        query, keys = cls._projection(fields)
+        if after is not None:
+            rows = query.filter(cls.id > after).order_by(cls.id).limit(per_page)
+        else:
+            rows = query.order_by(cls.id).paginate(page, per_page).items
         resources = [
-            resource.json()
-            for resource
-            in cls.query.order_by(cls.id).paginate(page, per_page).items
+            dict(zip(keys, row))
+            for row
+            in rows
         ]
         return resources
 
@@ -155,3 +256,15 @@ class Model():
 
 
 db = SQLAlchemy(model_class=Model)
+
+
+@event.listens_for(Model, 'instrument_class', propagate=True)
+def _compile_serializer(mapper, cls) -> None:
+    """Precomputes the columns json() reads, once per model."""
+    cls.__column_keys__ = tuple(cls.__table__.columns.keys())
+    getter = operator.attrgetter(*cls.__column_keys__)
+    if len(cls.__column_keys__) == 1:
+        # attrgetter of one attribute returns it bare.
+        cls.__row__ = staticmethod(lambda resource: (getter(resource),))
+    else:
+        cls.__row__ = staticmethod(getter)
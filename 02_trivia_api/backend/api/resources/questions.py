@@ -14,7 +14,6 @@ from api.models.category import Category
 from api.models.question import Question
 from api.models.model import db
 from api.resources.resource import Resource, register_api_all
-from config import Config
 
 
 class QuestionAPI(Resource):
@@ -23,26 +22,27 @@ class QuestionAPI(Resource):
     def get(self, resource_id: Optional[int] = None) -> Response:
         """Fetches one or more questions from the database.
         If 'resource_id' is given, return that specific question,
+        else if the 'after' HTTP parameter is set, return the 'limit'
+        questions following that id and the cursor of the next page,
         else if the 'page' HTTP parameter is set, return than page of questions,
         else return all questions."""
+        next_cursor = None
         if resource_id is not None:
             questions = [Question.fetch_by_id(resource_id)]
-        elif 'page' in request.args:
-            page = int(request.args.get('page'))
-            questions = Question.fetch_page(page, Config.PAGE_LENGTH)
         else:
-            questions = Question.fetch_all(Question.id)
+            questions, next_cursor = self._fetch_resources()
 
         question_count = Question.count_all()
 
-        categories = list(set([
-            Category.fetch_by_id(question['category'])['type']
+        # Projections without the category list no categories.
+        categories = Category.fetch_types(
+            question.get('category')
             for question
             in questions
-        ]))
+        )
 
-        if len(questions) == 1:
-            current_category = categories[0]
+        if len(questions) == 1 and questions[0].get('category') is not None:
+            current_category = categories.get(int(questions[0]['category']))
         else:
             current_category = None
 
@@ -53,6 +53,8 @@ class QuestionAPI(Resource):
             'categories': categories,
             'currentCategory': current_category,
         }
+        if 'after' in request.args:
+            response['next'] = next_cursor
 
         return jsonify(response)
 
@@ -1,6 +1,6 @@
 """Base for API resources as HTTP endpoints."""
 
-from typing import Optional, Type, TypeVar
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
 
 from flask import current_app, jsonify, make_response, request
 from flask.views import MethodView
@@ -31,17 +31,52 @@ class Resource(MethodView):
 
     def get(self, resource_id: Optional[int] = None) -> Response:
         """Fetches one or all resources from the database. If resource_id
-        is given, return that specific resource, otherwise return all."""
+        is given, return that specific resource, otherwise return all.
+
+        With the 'after' HTTP parameter, return the 'limit' resources
+        following that id and the cursor of the next page, which is null
+        on the last one."""
         if resource_id is not None:
-            resources = self.__model__.fetch_by_id(resource_id)
-        elif 'page' in request.args:
-            page = int(request.args.get('page'))
-            resources = self.__model__.fetch_page(page, Config.PAGE_LENGTH)
-        else:
-            resources = self.__model__.fetch_all()
+            return jsonify(self.__model__.fetch_by_id(resource_id))
 
+        resources, next_cursor = self._fetch_resources()
+        if 'after' in request.args:
+            return jsonify({'data': resources, 'next': next_cursor})
         return jsonify(resources)
 
+    def _fetch_resources(self) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Fetches the resources named by the 'after' and 'limit' or the
+        'page' HTTP parameters, or all of them, and the cursor following
+        them. The 'fields' HTTP parameter, e.g. fields=id,question, reads
+        only those columns."""
+        fields = None
+        if request.args.get('fields'):
+            fields = request.args['fields'].split(',')
+        if 'after' in request.args:
+            try:
+                after = int(request.args['after'])
+                limit = int(request.args.get('limit', Config.PAGE_LENGTH))
+            except ValueError:
+                raise BadRequestException('after and limit must be integers.')
+            if not 0 < limit <= Config.PAGE_LENGTH_MAX:
+                raise BadRequestException(
+                    f'limit must be between 1 and {Config.PAGE_LENGTH_MAX}.'
+                )
+            resources = self.__model__.fetch_page(after=after, per_page=limit,
+                                                  fields=fields)
+            # A full page may be followed by more; the next one tells.
+            if len(resources) == limit:
+                return resources, resources[-1]['id']
+            return resources, None
+        if 'page' in request.args:
+            page = request.args.get('page', 1, type=int)
+            if page < 1:
+                raise BadRequestException('page must be 1 or more.')
+            resources = self.__model__.fetch_page(page, Config.PAGE_LENGTH,
+                                                  fields=fields)
+            return resources, None
+        return self.__model__.fetch_all(self.__model__.id, fields), None
+
     #@audit_request
     @refuse_unknown_fields
     def patch(self, resource_id: int) -> Response:
@@ -0,0 +1,5 @@
+"""Benchmarks for the trivia API.
+
+Run them from the 02_trivia_api/backend directory, e.g.
+`python -m benchmarks.pagination`.
+"""
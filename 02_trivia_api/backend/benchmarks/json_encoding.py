@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Compares encoding question payloads with Flask's default JSON provider
+against JSONProvider on the standard library and on orjson, both as one
+listing of every question and as one response per question."""
+import argparse
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+from api.app import create_application
+from api.json_provider import JSONProvider, orjson
+
+
+def questions(count):
+    return [
+        {
+            'id': i,
+            'question': f'Which of these is question number {i}?',
+            'answer': f'Answer {i}',
+            'category': str(1 + i % 6),
+            'difficulty': 1 + i % 5,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def time_dumps(provider, payloads, repeat):
+    listing = {
+        'success': True,
+        'questions': payloads,
+        'totalQuestions': len(payloads),
+        'categories': {i: f'Category {i}' for i in range(1, 7)},
+        'currentCategory': None,
+    }
+    start = time.perf_counter()
+    for _ in range(repeat):
+        provider.dumps(listing, separators=(',', ':'))
+    listing_ms = (time.perf_counter() - start) * 1000 / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for payload in payloads:
+            provider.dumps(payload, separators=(',', ':'))
+    each_us = (time.perf_counter() - start) * 1e6 / repeat / len(payloads)
+    return listing_ms, each_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--questions', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_application('Testing')
+    payloads = questions(args.questions)
+    standard = JSONProvider(app)
+    standard.accelerated = False
+    providers = {'flask default': DefaultJSONProvider(app),
+                 'stdlib': standard}
+    if orjson is not None:
+        providers['orjson'] = JSONProvider(app)
+    else:
+        print('orjson is not installed; pip install orjson to compare it')
+
+    print(f'{args.questions:,} questions')
+    with app.app_context():
+        for name, provider in providers.items():
+            listing_ms, each_us = time_dumps(provider, payloads, args.repeat)
+            print(f'{name:>13}: listing {listing_ms:8.2f} ms  '
+                  f'one by one {each_us:6.2f} us per question')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Compares fetching a deep page of questions by page number, which skips
+the earlier rows with OFFSET and counts the table, against fetching the
+same page after the last id of the one before it."""
+import argparse
+import tempfile
+import time
+
+from api.app import create_application
+from api.models.model import db
+from api.models.question import Question
+
+
+def seed(count, batch_size=10000):
+    table = Question.__table__
+    for first in range(0, count, batch_size):
+        db.session.execute(table.insert(), [
+            {'question': f'Question {i}?', 'answer': f'Answer {i}',
+             'category': str(1 + i % 6), 'difficulty': 1 + i % 5}
+            for i in range(first, min(first + batch_size, count))
+        ])
+    db.session.commit()
+
+
+def time_fetches(fetch, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        resources = fetch()
+    return (time.perf_counter() - start) * 1000 / repeat, resources
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--questions', type=int, default=200000)
+    parser.add_argument('--page', type=int, default=10000)
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a temporary SQLite database')
+    args = parser.parse_args()
+    if args.page * args.per_page > args.questions:
+        parser.error('--questions must fill --page pages of --per-page')
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_application('Testing')
+        app.config['SQLALCHEMY_DATABASE_URI'] = (
+            args.database_url or f'sqlite:///{directory}/bench.db'
+        )
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            seed(args.questions)
+            # The id of the last question on the page before.
+            after = (
+                db.session.query(Question.id)
+                          .order_by(Question.id)
+                          .offset((args.page - 1) * args.per_page - 1)
+                          .limit(1)
+                          .scalar()
+            )
+
+            print(f'{args.questions:,} questions, page {args.page:,} of '
+                  f'{args.per_page}')
+            for label, page, cursor in (('first', 1, 0),
+                                        ('deep', args.page, after)):
+                offset_ms, by_page = time_fetches(
+                    lambda: Question.fetch_page(page, args.per_page),
+                    args.repeat
+                )
+                keyset_ms, by_cursor = time_fetches(
+                    lambda: Question.fetch_page(after=cursor,
+                                                per_page=args.per_page),
+                    args.repeat
+                )
+                assert by_page == by_cursor
+                print(f'{label:>6} page  OFFSET and count {offset_ms:8.2f} ms'
+                      f'  keyset {keyset_ms:8.2f} ms')
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -7,10 +7,32 @@ class Config(object):
     """Sets Flask configuration variables."""
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     PAGE_LENGTH = 5
+    # Most resources one ?after= page may ask for with limit.
+    PAGE_LENGTH_MAX = 100
+    # Cached row counts are recounted exactly once they are this old.
+    ROW_COUNT_RECONCILE_SECONDS = 60
+    # Encodes responses; see api/json_provider.py. JSON_ACCELERATED uses
+    # orjson when it is installed.
+    JSON_PROVIDER = 'api.json_provider.JSONProvider'
+    JSON_ACCELERATED = True
+    # Connection pool of each worker process; see api/db_pool.py.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 5,
+        'max_overflow': 5,
+        'pool_timeout': 10,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+    }
 
 
 class ProductionConfig(Config):
     """Sets Flask configuration variables for the production environment."""
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        **Config.SQLALCHEMY_ENGINE_OPTIONS,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
 
 
 class DevelopmentConfig(Config):
@@ -20,10 +42,15 @@ class DevelopmentConfig(Config):
     FLASK_ENV = 'development'
     #HOST = '0.0.0.0'
     SERVER_NAME = 'pythondev.local:5000'
-    SQLALCHEMY_DATABASE_URI = 'postgres://jsmith@localhost:5432/trivia'
+    SQLALCHEMY_DATABASE_URI = 'postgresql://jsmith@localhost:5432/trivia'
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        **Config.SQLALCHEMY_ENGINE_OPTIONS,
+        'pool_size': 2,
+        'max_overflow': 3,
+    }
 
 
 class TestingConfig(Config):
     """Sets Flask configuration variables for the testing environment."""
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
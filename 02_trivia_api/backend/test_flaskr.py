@@ -1,38 +1,183 @@
 import os
 import unittest
 import json
-from flask_sqlalchemy import SQLAlchemy
+from datetime import date, datetime, time
+from decimal import Decimal
 
-from api import create_app
-from models import setup_db, Question, Category
+from sqlalchemy import event
+
+from api.app import create_application
+from api.json_provider import JSONProvider
+from api.models.category import Category
+from api.models.model import Model, db
+from api.models.question import Question
 
 
 class TriviaTestCase(unittest.TestCase):
     """This class represents the trivia test case"""
 
+    @classmethod
+    def setUpClass(cls):
+        # The resources register their routes on import, so only the first
+        # application created has them.
+        cls.app = create_application('Testing')
+
     def setUp(self):
         """Define test variables and initialize app."""
-        self.app = create_app()
-        self.client = self.app.test_client
-        self.database_name = "trivia_test"
-        self.database_path = "postgres://{}/{}".format('localhost:5432', self.database_name)
-        setup_db(self.app, self.database_path)
-
+        self.client = self.app.test_client()
         # binds the app to the current context
-        with self.app.app_context():
-            self.db = SQLAlchemy()
-            self.db.init_app(self.app)
-            # create all tables
-            self.db.create_all()
+        self.context = self.app.app_context()
+        self.context.push()
+        # create all tables
+        db.create_all()
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
 
     def tearDown(self):
         """Executed after reach test"""
-        pass
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        db.session.remove()
+        db.drop_all()
+        Model.forget_counts()
+        self.context.pop()
+
+    def _record(self, conn, cursor, statement, parameters, context, many):
+        self.statements.append(statement)
+
+    def _seed_questions(self, count):
+        categories = [Category(type=type)
+                      for type in ('Science', 'Art', 'History')]
+        db.session.add_all(categories)
+        db.session.flush()
+        db.session.add_all(
+            Question(question=f'Question {i}?', answer=f'Answer {i}',
+                     category=str(categories[i % 3].id), difficulty=1)
+            for i in range(count)
+        )
+        db.session.commit()
+
+    def _count_queries(self, url):
+        self.statements.clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(self.statements), json.loads(response.data)
+
+    def test_list_questions_maps_category_ids_to_types(self):
+        self._seed_questions(4)
+        _, data = self._count_queries('/questions')
+        self.assertEqual(data['totalQuestions'], 4)
+        self.assertEqual(data['categories'],
+                         {'1': 'Science', '2': 'Art', '3': 'History'})
+
+        _, data = self._count_queries('/questions/2')
+        self.assertEqual(data['categories'], {'2': 'Art'})
+        self.assertEqual(data['currentCategory'], 'Art')
+
+    def test_list_questions_query_count_is_constant(self):
+        urls = ('/questions', '/questions?page=1')
+        self._seed_questions(2)
+        Question.count_all('exact')
+        few = [self._count_queries(url)[0] for url in urls]
+        db.drop_all()
+        db.create_all()
+        self._seed_questions(30)
+        Question.count_all('exact')
+        many = [self._count_queries(url)[0] for url in urls]
+        self.assertEqual(few, many)
+
+    def test_count_all_follows_inserts_and_deletes(self):
+        self._seed_questions(3)
+        self.assertEqual(Question.count_all(), 3)
+        question = Question(question='Question?', answer='Answer',
+                            category='1', difficulty=2)
+        question.insert()
+        self.statements.clear()
+        self.assertEqual(Question.count_all(), 4)
+        response = self.client.delete(f'/questions/{question.id}')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self._count_queries('/questions')[1]['totalQuestions'],
+                         3)
+        self.assertFalse([statement for statement in self.statements
+                          if 'count(' in statement])
+
+    def test_count_all_reconciles_writes_it_missed(self):
+        self._seed_questions(3)
+        self.assertEqual(Question.count_all(), 3)
+        db.session.execute(Question.__table__.delete())
+        db.session.commit()
+        self.assertEqual(Question.count_all(), 3)
+        self.assertEqual(Question.count_all('exact'), 0)
+        self.assertEqual(Question.count_all('estimate'), 0)
+
+        self._seed_questions(2)
+        self.app.config['ROW_COUNT_RECONCILE_SECONDS'] = 0
+        self.addCleanup(self.app.config.update, ROW_COUNT_RECONCILE_SECONDS=60)
+        self.assertEqual(Question.count_all(), 2)
+        with self.assertRaises(ValueError):
+            Question.count_all('approximate')
+
+    def test_list_questions_follows_cursor(self):
+        self._seed_questions(7)
+        Question.count_all('exact')
+        ids, after = [], 0
+        while after is not None:
+            _, data = self._count_queries(f'/questions?after={after}&limit=3')
+            self.assertLessEqual(len(data['questions']), 3)
+            self.assertIn('WHERE questions.id > ?', self.statements[0])
+            self.assertFalse([statement for statement in self.statements
+                              if 'count(' in statement])
+            ids += [question['id'] for question in data['questions']]
+            after = data['next']
+        self.assertEqual(ids, list(range(1, 8)))
+
+        for url in ('/questions?after=x', '/questions?after=1&limit=0',
+                    '/questions?after=1&limit=101', '/questions?page=0'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('message', json.loads(response.data))
+        self.assertEqual(self.client.get('/questions?page=x').status_code,
+                         200)
+
+    def test_list_questions_projects_fields(self):
+        self._seed_questions(4)
+        _, data = self._count_queries('/questions?fields=question&page=1')
+        self.assertEqual(data['questions'][0], {'id': 1,
+                                                'question': 'Question 0?'})
+        self.assertEqual(data['categories'], {})
+        self.assertIn('SELECT questions.id AS questions_id, '
+                      'questions.question AS questions_question \nFROM',
+                      self.statements[0])
+
+        _, data = self._count_queries('/questions?fields=id,category')
+        self.assertEqual(data['questions'][1], {'id': 2, 'category': '2'})
+        self.assertEqual(data['categories'],
+                         {'1': 'Science', '2': 'Art', '3': 'History'})
+        self.assertEqual(
+            self.client.get('/questions?fields=id,secret').status_code, 400
+        )
 
-    """
-    TODO
-    Write at least one test for each test for successful operation and for expected errors.
-    """
+    def test_json_provider_encodes_alike_with_either_encoder(self):
+        self.assertIsInstance(self.app.json, JSONProvider)
+        payload = {
+            'score': Decimal('2.50'),
+            'day': date(2020, 1, 2),
+            'at': datetime(2020, 1, 2, 3, 4, 5),
+            'time': time(3, 4, 5),
+            'categories': {2: 'ünïcode', 1: 'Science'},
+        }
+        decoded = []
+        for accelerated in (True, False):
+            provider = JSONProvider(self.app)
+            provider.accelerated = provider.accelerated and accelerated
+            decoded.append(json.loads(provider.dumps(payload)))
+        self.assertEqual(decoded[0], decoded[1])
+        self.assertEqual(decoded[0], {
+            'score': 2.5,
+            'day': '2020-01-02',
+            'at': '2020-01-02T03:04:05',
+            'time': '03:04:05',
+            'categories': {'1': 'Science', '2': 'ünïcode'},
+        })
 
 
 # Make the tests conveniently executable